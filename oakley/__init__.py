@@ -3,4 +3,12 @@ from .fancy_string import cstr
 from .message import Message
 from .progress_bar import ProgressBar
 from .task import Task
+from .live_region import LiveRegion
+from .history import History
+from .trace import Trace
+from .timings import Timings
+from .bench import Benchmark
+from .cache import Cache
+from .graph import TaskGraph
+from .output_writer import OutputWriter
 from .status import MemoryView, TODO, DateTime
\ No newline at end of file
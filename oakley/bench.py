@@ -0,0 +1,232 @@
+import gc
+import math
+import time
+import inspect
+import itertools
+import statistics
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+class Benchmark:
+    """
+    Calibrated micro-benchmarks, behind :meth:`Task.bench` and
+    :meth:`Task.compare`.
+
+    Like ``timeit``, a function is called in batches of ``number`` calls,
+    ``number`` being chosen (1, 2, 5, 10, 20...) so that a batch lasts at
+    least :attr:`target_time`: the clock resolution and the cost of reading
+    it become negligible. The cost of the loop and of calling a function
+    with the same arguments is measured with an empty function, and
+    subtracted from each batch. A benchmark is ``repeat`` batches, after
+    ``warmup`` calls (caches, lazy imports, JIT-like warm-ups).
+
+    Statistics are robust to the outliers that any machine produces
+    (interrupts, other processes): the median and the MAD (median absolute
+    deviation) of the time per call, and the minimum, the best estimate of
+    the cost without noise.
+
+    Examples
+    --------
+    >>> Benchmark.run(sorted, data)
+    {'name': 'sorted', 'number': 2000, 'repeat': 20, 'min': 4.1e-05, 'median': 4.2e-05, 'mad': 3.5e-07, ...}
+    >>> Benchmark.compare(parse_v1, parse_v2, line)["p_value"]
+    1.2e-07
+    """
+
+    target_time = 0.02 # minimal duration of a batch, in seconds
+    significance = 0.01 # p-value below which two functions are considered different
+
+    # ------------------- #
+    # !-- Measurement --! #
+    # ------------------- #
+
+    @staticmethod
+    def _batch(fn, args:tuple, kwargs:dict, number:int) -> float:
+        loop = itertools.repeat(None, number)
+        start = time.perf_counter()
+        for _ in loop:
+            fn(*args, **kwargs)
+        return time.perf_counter() - start
+
+    @staticmethod
+    def autorange(fn, args:tuple = (), kwargs:dict = None) -> int:
+        """
+        Return the number of calls of ``fn`` needed for a batch to last at
+        least :attr:`target_time`.
+        """
+        kwargs = kwargs or {}
+        for exponent in itertools.count():
+            for factor in (1, 2, 5):
+                number = factor * 10 ** exponent
+                if Benchmark._batch(fn, args, kwargs, number) >= Benchmark.target_time:
+                    return number
+
+    @staticmethod
+    def overhead(number:int, args:tuple = (), kwargs:dict = None) -> float:
+        """
+        Return the duration of a batch of ``number`` calls of an empty
+        function with the same arguments (best of 5).
+        """
+        kwargs = kwargs or {}
+        return min(Benchmark._batch(_noop, args, kwargs, number) for _ in range(5))
+
+    @staticmethod
+    def _samples(fn, args:tuple, kwargs:dict, number:int, overhead:float) -> float:
+        """
+        Time per call of one batch, without the overhead.
+        """
+        return max(0.0, Benchmark._batch(fn, args, kwargs, number) - overhead) / number
+
+    @staticmethod
+    def _summary(name:str, samples:list, number:int, overhead:float) -> dict:
+        median = statistics.median(samples)
+        return {
+            "name": name,
+            "number": number,
+            "repeat": len(samples),
+            "min": min(samples),
+            "median": median,
+            "mad": statistics.median([abs(sample - median) for sample in samples]),
+            "overhead": overhead / number, # per call, already subtracted
+            "samples": samples,
+        }
+
+    # ----------- #
+    # !-- API --! #
+    # ----------- #
+
+    @staticmethod
+    def run(fn, *args, repeat:int = 20, warmup:int = 1, number:int = None, disable_gc:bool = False, **kwargs) -> dict:
+        """
+        Benchmark ``fn(*args, **kwargs)``.
+
+        Parameters
+        ----------
+        fn : callable
+            The function to measure (not a coroutine function).
+        repeat : int, optional
+            Number of batches. Default is 20.
+        warmup : int, optional
+            Calls before measuring. Default is 1.
+        number : int, optional
+            Calls per batch. Default is chosen by :meth:`autorange`.
+        disable_gc : bool, optional
+            Disable the garbage collector while measuring, so that its
+            pauses do not land randomly in the batches (but the cost of the
+            garbage created by ``fn`` is then not counted). Default is
+            ``False``.
+
+        Returns
+        -------
+        dict
+            ``name``, ``number``, ``repeat``, and the ``min``, ``median``
+            and ``mad`` of the time per call in seconds, the subtracted
+            ``overhead`` per call, and the ``samples``.
+        """
+        return Benchmark._measure([fn], args, kwargs, repeat, warmup, number, disable_gc)[0]
+
+    @staticmethod
+    def compare(fn_a, fn_b, *args, repeat:int = 20, warmup:int = 1, disable_gc:bool = False, **kwargs) -> dict:
+        """
+        Benchmark two implementations with the same arguments, their batches
+        interleaved (so that a slow drift of the machine affects both), and
+        test whether they differ with a Mann-Whitney U test.
+
+        Returns
+        -------
+        dict
+            ``a`` and ``b`` (the results of :meth:`run`), ``speedup`` (median
+            time of ``a`` / median time of ``b``: above 1 if ``b`` is
+            faster), and the two-sided ``p_value``.
+        """
+        a, b = Benchmark._measure([fn_a, fn_b], args, kwargs, repeat, warmup, None, disable_gc)
+        return {
+            "a": a,
+            "b": b,
+            "speedup": a["median"] / b["median"] if b["median"] > 0 else math.inf,
+            "p_value": Benchmark.mann_whitney(a["samples"], b["samples"]),
+        }
+
+    @staticmethod
+    def _measure(fns:list, args:tuple, kwargs:dict, repeat:int, warmup:int, number:int, disable_gc:bool) -> list:
+        assert repeat >= 1 and warmup >= 0, "repeat must be positive, warmup cannot be negative."
+        assert not any(inspect.iscoroutinefunction(fn) for fn in fns), "Coroutine functions cannot be benchmarked."
+        for fn in fns:
+            for _ in range(warmup):
+                fn(*args, **kwargs)
+        numbers = [number or Benchmark.autorange(fn, args, kwargs) for fn in fns]
+        overheads = [Benchmark.overhead(n, args, kwargs) for n in numbers]
+        samples = [[] for _ in fns]
+
+        gc_was_enabled = gc.isenabled()
+        if disable_gc:
+            gc.disable()
+        try:
+            for _ in range(repeat):
+                for fn, n, overhead, fn_samples in zip(fns, numbers, overheads, samples):
+                    fn_samples.append(Benchmark._samples(fn, args, kwargs, n, overhead))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return [
+            Benchmark._summary(getattr(fn, "__qualname__", repr(fn)), fn_samples, n, overhead)
+            for fn, n, overhead, fn_samples in zip(fns, numbers, overheads, samples)
+        ]
+
+    # ------------------ #
+    # !-- Statistics --! #
+    # ------------------ #
+
+    @staticmethod
+    def mann_whitney(x:list, y:list) -> float:
+        """
+        Two-sided p-value of the Mann-Whitney U test (normal approximation,
+        with the correction for ties): the probability that samples as
+        different as ``x`` and ``y`` come from the same distribution. Makes
+        no assumption on the shape of the distributions.
+        """
+        n1, n2 = len(x), len(y)
+        values = sorted([(value, 0) for value in x] + [(value, 1) for value in y])
+        n = n1 + n2
+        rank_sum_x = 0.0
+        ties = 0.0
+        i = 0
+        while i < n:
+            j = i
+            while j + 1 < n and values[j + 1][0] == values[i][0]:
+                j += 1
+            rank = (i + j) / 2 + 1 # average rank of the tied values
+            rank_sum_x += rank * sum(1 for k in range(i, j + 1) if values[k][1] == 0)
+            t = j - i + 1
+            ties += t ** 3 - t
+            i = j + 1
+        u = rank_sum_x - n1 * (n1 + 1) / 2
+        variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+        if variance <= 0:
+            return 1.0
+        z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance) # with continuity correction
+        return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+
+if __name__ == '__main__':
+    import random
+
+    data = [random.random() for _ in range(1000)]
+
+    def sort_copy(values):
+        return sorted(values)
+
+    def sort_in_place(values):
+        values = list(values)
+        values.sort()
+        return values
+
+    print(Benchmark.run(sort_copy, data, repeat=10)["median"])
+    result = Benchmark.compare(sort_copy, sort_in_place, data)
+    print(f"speedup {result['speedup']:.3f}, p = {result['p_value']:.3g}")
+    result = Benchmark.compare(sum, lambda values: sum(sorted(values)), data)
+    print(f"speedup {result['speedup']:.3f}, p = {result['p_value']:.3g}")
@@ -0,0 +1,290 @@
+import os
+import time
+import pickle
+import hashlib
+import inspect
+import tempfile
+import functools
+
+from .config import config
+
+
+class Cache:
+    """
+    On-disk memoization of expensive stages, behind :meth:`Task.cached`.
+
+    The return value of a stage is stored in the cache directory
+    (``config["cache_dir"]``, ``~/.oakley_cache`` by default), under a key
+    combining the name of the stage, a hash of its arguments and, unless
+    disabled, a hash of the source code of the function: editing the
+    function invalidates its entries. A later call with the same arguments
+    (e.g. after a kernel restart) loads the value instead of computing it.
+
+    - Large NumPy arrays (more than ``config["cache_mmap_size"]`` bytes) are
+      stored as ``.npy`` files and loaded memory-mapped, read-only: loading
+      them is instantaneous, and only the parts that are read are loaded.
+    - Everything else is pickled.
+    - When the cache grows above ``config["cache_max_size"]`` bytes, the
+      least recently used entries are deleted.
+
+    Notes
+    -----
+    - Arguments must be picklable, to be hashed. Numbers, strings, bytes,
+      lists, tuples, sets, dicts and NumPy arrays (nested in any way) give
+      the same key in every run; other objects are hashed through their
+      pickle, which must not depend on the run (e.g. contain no set).
+    - Entries are written to a temporary file first, then moved: a crash or
+      a concurrent process never leaves a half-written entry.
+    - Only the function's own source is hashed, not the functions it calls.
+
+    Examples
+    --------
+    >>> @Task.cached
+    ... def load(path):
+    ...     return pd.read_parquet(path)
+    >>> df = load("data.parquet")
+    [~] load (2.13s)
+    >>> df = load("data.parquet") # after a restart
+    [~] load (cached, 0.02s)
+    """
+
+    default_dir = os.path.join(os.path.expanduser("~"), ".oakley_cache")
+
+    # ------------ #
+    # !-- Keys --! #
+    # ------------ #
+
+    @staticmethod
+    def directory() -> str:
+        path = os.path.abspath(os.path.expanduser(config["cache_dir"] or Cache.default_dir))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def key(name:str, args:tuple = (), kwargs:dict = None, fn = None) -> str:
+        """
+        Return the cache key of a call: a hash of ``name``, of the
+        arguments and of the source of ``fn`` (if given).
+        """
+        digest = hashlib.sha256(name.encode())
+        try:
+            digest.update(Cache._canonical((tuple(args), kwargs or {})))
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            raise TypeError(f"The arguments of '{name}' cannot be hashed for the cache: {e}") from None
+        if fn is not None:
+            try:
+                digest.update(inspect.getsource(fn).encode())
+            except (OSError, TypeError): # no source available (e.g. built in the interpreter)
+                code = getattr(fn, "__code__", None)
+                if code is not None:
+                    digest.update(code.co_code)
+        return digest.hexdigest()[:32]
+
+    @staticmethod
+    def _canonical(value) -> bytes:
+        """
+        Bytes identifying ``value``, the same in every run: sets and dicts
+        are sorted (their order depends on the hash seed and on the
+        insertion order), and NumPy arrays are reduced to their dtype,
+        shape and data. Other objects are pickled.
+        """
+        if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+            return pickle.dumps(value, protocol=5)
+        kind = f"{type(value).__module__}.{type(value).__qualname__}".encode()
+        if isinstance(value, (list, tuple)):
+            parts = [Cache._canonical(item) for item in value]
+        elif isinstance(value, (set, frozenset)):
+            parts = sorted(Cache._canonical(item) for item in value)
+        elif isinstance(value, dict):
+            items = sorted((Cache._canonical(k), Cache._canonical(v)) for k, v in value.items())
+            parts = [part for item in items for part in item]
+        elif type(value).__name__ == "ndarray" and type(value).__module__ == "numpy": # no numpy import needed
+            if value.dtype == object:
+                parts = [Cache._canonical(value.shape), Cache._canonical(value.tolist())]
+            else:
+                data = value.tobytes() # C order, whatever the memory layout
+                parts = [value.dtype.str.encode(), Cache._canonical(value.shape), hashlib.sha256(data).digest()]
+        else:
+            return kind + b":" + pickle.dumps(value, protocol=5)
+        return kind + b"[" + b"".join(len(part).to_bytes(8, "little") + part for part in parts) + b"]"
+
+    # ------------------ #
+    # !-- Read/Write --! #
+    # ------------------ #
+
+    @staticmethod
+    def _paths(key:str) -> tuple[str, str]:
+        directory = Cache.directory()
+        return os.path.join(directory, key + ".npy"), os.path.join(directory, key + ".pkl")
+
+    @staticmethod
+    def load(key:str) -> tuple[bool, object]:
+        """
+        Return ``(True, value)`` if ``key`` is in the cache, else
+        ``(False, None)``. Marks the entry as recently used.
+        """
+        npy_path, pkl_path = Cache._paths(key)
+        for path in (npy_path, pkl_path):
+            if not os.path.exists(path):
+                continue
+            try:
+                if path == npy_path:
+                    import numpy as np
+                    value = np.load(path, mmap_mode="r")
+                else:
+                    with open(path, "rb") as f:
+                        value = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+                continue # corrupted or deleted meanwhile: recompute
+            os.utime(path) # least recently used = oldest modification time
+            return True, value
+        return False, None
+
+    @staticmethod
+    def store(key:str, value) -> None:
+        """
+        Store ``value`` under ``key``, then evict the least recently used
+        entries if the cache is too large.
+        """
+        npy_path, pkl_path = Cache._paths(key)
+        is_array = type(value).__name__ == "ndarray" and type(value).__module__ == "numpy" # no numpy import needed
+        as_npy = is_array and value.dtype != object and value.nbytes >= config["cache_mmap_size"]
+        path = npy_path if as_npy else pkl_path
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if as_npy:
+                    import numpy as np
+                    np.save(f, value, allow_pickle=False)
+                else:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path) # atomic
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        Cache.evict()
+
+    # ---------------- #
+    # !-- Eviction --! #
+    # ---------------- #
+
+    @staticmethod
+    def _entries() -> list:
+        """
+        Return the ``(last use, size, path)`` of every entry, least recently
+        used first.
+        """
+        entries = []
+        for entry in os.scandir(Cache.directory()):
+            if entry.name.endswith((".npy", ".pkl")):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    @staticmethod
+    def size() -> int:
+        """
+        Total size of the cache, in bytes.
+        """
+        return sum(size for _, size, _ in Cache._entries())
+
+    @staticmethod
+    def evict(max_size:int = None) -> None:
+        """
+        Delete the least recently used entries until the cache holds at
+        most ``max_size`` bytes (default is ``config["cache_max_size"]``,
+        ``None`` for no limit).
+        """
+        max_size = config["cache_max_size"] if max_size is None else max_size
+        if max_size is None:
+            return
+        entries = Cache._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_size:
+                break
+            try:
+                os.remove(path) # a memory-mapped array stays readable until it is closed (on POSIX)
+            except OSError:
+                continue
+            total -= size
+
+    @staticmethod
+    def clear() -> None:
+        """
+        Delete every entry of the cache. Other files of the directory are
+        kept.
+        """
+        for entry in os.scandir(Cache.directory()):
+            if entry.name.endswith((".npy", ".pkl", ".tmp")):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    # ----------------- #
+    # !-- Decorator --! #
+    # ----------------- #
+
+    @staticmethod
+    def memoize(fn, name:str = None, source:bool = True):
+        """
+        Return ``fn`` wrapped so that its results are cached on disk, each
+        call being displayed as a `Task` named ``name`` (default is the
+        qualified name of the function). If ``source`` is set, the source
+        of ``fn`` is part of the key.
+        """
+        from .task import Task # circular import: the task module exposes the decorator
+        from .message import Message
+
+        name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def cached(*args, **kwargs):
+            start = time.perf_counter()
+            key = Cache.key(name, args, kwargs, fn if source else None)
+            hit, value = Cache.load(key)
+            if hit:
+                Task._print_cached(name, time.perf_counter() - start)
+                return value
+            with Task(name):
+                value = fn(*args, **kwargs)
+                try:
+                    Cache.store(key, value)
+                except (pickle.PicklingError, TypeError, AttributeError, OSError) as e:
+                    Message(f"The result of '{name}' could not be cached: {e}", "?")
+            return value
+        return cached
+
+
+
+if __name__ == '__main__':
+    import numpy as np
+    from .task import Task
+
+    previous = config["cache_dir"], config["cache_max_size"]
+    config["cache_dir"] = tempfile.mkdtemp()
+    config["cache_max_size"] = 12 * 1024 ** 2
+
+    @Task.cached
+    def load(n):
+        time.sleep(1)
+        return np.zeros((n, 1000))
+
+    @Task.cached("Build index")
+    def index(words):
+        time.sleep(0.5)
+        return {word: i for i, word in enumerate(words)}
+
+    for _ in range(2):
+        array = load(800) # 6.4 MB: memory-mapped
+        index(["a", "b", "c"])
+    load(1000) # 8 MB: evicts the first array
+    print(f"Cache size: {Cache.size() / 1024 ** 2:.0f} MB")
+
+    Cache.clear()
+    config["cache_dir"], config["cache_max_size"] = previous
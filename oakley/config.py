@@ -5,6 +5,23 @@ import os
 _default_config = {
     "terminal_width": -1, # if -1, auto-detect,
     "spinner": [],
+    "overhead_budget": 0.01, # max fraction of the loop time spent drawing progress bars
+    "history": None, # path of the run history database, None to disable it (see History.enable)
+    "regression_threshold": 0.3, # warn when a run is slower than usual by more than this fraction
+    "display_mode": "auto", # "tty" (redrawn in place), "log" (periodic plain lines) or "auto" (tty if stdout is a terminal)
+    "log_interval": 30, # in log mode, seconds between two status lines
+    "log_percent": 10, # in log mode, also print a status line every time this percentage is crossed (after log_interval seconds)
+    "profile_interval": 0.005, # seconds between two samples of Task(profile=True)
+    "profile_top": 10, # number of functions and call paths reported by Task(profile=True)
+    "trace": None, # path of the Chrome trace written at exit, None to disable it (see Trace.enable)
+    "trace_bars": False, # also record the progress bar loops in the trace
+    "timings_at_exit": True, # print the table of Timings at exit, if any function was timed
+    "loop_lag_interval": 0.01, # seconds between two probes of the event loop monitor
+    "loop_lag_threshold": 0.1, # event loop lag (seconds) above which the blocking coroutine is reported
+    "cache_dir": None, # directory of Task.cached, None for ~/.oakley_cache
+    "cache_max_size": 5 * 1024 ** 3, # bytes, the least recently used entries are evicted above it (None for no limit)
+    "cache_mmap_size": 1024 ** 2, # NumPy arrays larger than this (bytes) are cached as memory-mapped .npy files
+    "async_output": False, # write the output from a background thread (see OutputWriter.enable)
 }
 
 # 1. Load the config.json file if it exists.
@@ -0,0 +1,338 @@
+import math
+from abc import ABC, abstractmethod
+
+
+class Estimator(ABC):
+    """
+    Base class for the throughput estimators used by `ProgressBar`.
+
+    An estimator is fed ``(time, count)`` pairs, where ``time`` comes from
+    ``time.perf_counter_ns`` (monotonic, not affected by NTP adjustments)
+    and ``count`` is the number of completed items. It answers two
+    questions: what is the current rate (items per second), and how long
+    until ``remaining`` more items are done, with a confidence band.
+
+    Feeding is O(1): consecutive updates closer than ``resolution`` seconds
+    only overwrite the latest pair. The statistics are computed over
+    *intervals* of at least ``resolution`` seconds, which keeps them
+    meaningful for both slow and extremely fast loops.
+
+    Subclasses must implement the abstract methods :meth:`_add_interval`,
+    :meth:`rate` and :meth:`_relative_error`: an incomplete subclass cannot
+    be instantiated.
+
+    Parameters
+    ----------
+    resolution : float, optional
+        Minimal duration (in seconds) of an interval. Default is 0.1.
+
+    Examples
+    --------
+    >>> est = Estimator.from_spec("window")
+    >>> est.start(time.perf_counter_ns())
+    >>> est.update(time.perf_counter_ns(), 10)
+    >>> est.eta(90)
+    (12.3, 1.4)
+    """
+
+    models = {} # name -> Estimator subclass, filled below
+
+    def __init__(self, resolution:float = 0.1) -> None:
+        assert resolution > 0, "The resolution must be positive."
+        self.resolution_ns = int(resolution * 1e9)
+        self.prior = None # (rate, relative error, weight in seconds), see seed
+        self.start(0)
+
+    def start(self, t_ns:int, count:int = 0) -> None:
+        """
+        (Re)start the estimator at time ``t_ns`` with ``count`` items already done.
+        """
+        self.start_ns = t_ns
+        self.start_count = count
+        self.last_ns = t_ns
+        self.last_count = count
+        self.interval_ns = t_ns # beginning of the current (open) interval
+        self.interval_count = count
+
+    def update(self, t_ns:int, count:int) -> None:
+        """
+        Record that ``count`` items were completed at time ``t_ns``.
+        """
+        self.last_ns = t_ns
+        self.last_count = count
+        delta_ns = t_ns - self.interval_ns
+        if delta_ns >= self.resolution_ns:
+            self._add_interval(delta_ns, count - self.interval_count, t_ns, count)
+            self.interval_ns = t_ns
+            self.interval_count = count
+
+    def seed(self, rate:float, rel_error:float = None, weight:float = 5.0) -> None:
+        """
+        Give a prior throughput (e.g. from previous runs, see `History`).
+
+        Until enough data is collected, the ETA is computed from a blend of
+        the prior and the measured rate. The prior weighs as much as
+        ``weight`` seconds of measurements, so it fades away as the run
+        goes on. ``rel_error`` is the relative uncertainty of the prior,
+        used as the ETA spread until it can be measured.
+        """
+        assert rate > 0, "The prior rate must be positive."
+        self.prior = (rate, rel_error, weight)
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds between :meth:`start` and the last update.
+        """
+        return (self.last_ns - self.start_ns) * 1e-9
+
+    # ------------------ #
+    # !-- Statistics --! #
+    # ------------------ #
+
+    @abstractmethod
+    def _add_interval(self, delta_ns:int, delta_count:int, t_ns:int, count:int) -> None:
+        ...
+
+    @abstractmethod
+    def rate(self) -> float|None:
+        """
+        Current throughput estimate in items per second, ``None`` if unknown.
+        """
+
+    @abstractmethod
+    def _relative_error(self) -> float|None:
+        """
+        Relative standard error of :meth:`rate`, ``None`` if unknown.
+        """
+
+    def eta(self, remaining:float) -> tuple[float, float|None]|None:
+        """
+        Estimate the time needed to complete ``remaining`` more items.
+
+        Returns
+        -------
+        tuple of (float, float or None), or None
+            ``(eta, spread)`` in seconds, where the true value is expected to
+            lie within ``eta ± spread``. ``spread`` is ``None`` while there
+            are not enough intervals to estimate it. ``None`` if no rate is
+            known yet.
+        """
+        rate = self.rate()
+        rel_error = self._relative_error()
+        if self.prior is not None:
+            prior_rate, prior_error, weight = self.prior
+            elapsed = self.elapsed
+            rate = prior_rate if rate is None else (elapsed * rate + weight * prior_rate) / (elapsed + weight)
+            if rel_error is None:
+                rel_error = prior_error
+        if rate is None:
+            return None
+        if rate <= 0:
+            return float("inf"), None
+        eta = remaining / rate
+        if rel_error is None:
+            return eta, None
+        return eta, eta * rel_error
+
+    def _instant_rate(self) -> float|None:
+        """
+        Rate between the start and the last update. Used until the first
+        interval is closed.
+        """
+        delta_ns = self.last_ns - self.start_ns
+        if delta_ns <= 0:
+            return None
+        return (self.last_count - self.start_count) / (delta_ns * 1e-9)
+
+    # ------------- #
+    # !-- Utils --! #
+    # ------------- #
+
+    @staticmethod
+    def from_spec(spec:'str|Estimator') -> 'Estimator':
+        """
+        Build an estimator from its name (see :attr:`Estimator.models`), or
+        return ``spec`` unchanged if it already is an `Estimator`.
+        """
+        if isinstance(spec, Estimator):
+            return spec
+        assert spec in Estimator.models, f"Unknown estimator '{spec}'. Choose among {list(Estimator.models.keys())}."
+        return Estimator.models[spec]()
+
+
+class WindowedEstimator(Estimator):
+    """
+    Throughput over a sliding window of the last ``size`` intervals.
+
+    The intervals are stored in a fixed-size ring buffer, and the sums
+    needed for the mean and variance of the per-interval rates are updated
+    incrementally, so that each update is O(1).
+
+    Parameters
+    ----------
+    size : int, optional
+        Number of intervals in the window. Default is 100 (10 seconds with
+        the default resolution).
+    resolution : float, optional
+        Minimal duration (in seconds) of an interval. Default is 0.1.
+    """
+
+    def __init__(self, size:int = 100, resolution:float = 0.1) -> None:
+        assert size >= 2, "The window must contain at least two intervals."
+        self.size = size
+        super().__init__(resolution)
+
+    def start(self, t_ns:int, count:int = 0) -> None:
+        super().start(t_ns, count)
+        self.ring = [None] * self.size # (end time, end count, rate) of each interval
+        self.head = 0 # index of the next slot to write
+        self.n = 0
+        self.oldest_ns = t_ns # beginning of the window
+        self.oldest_count = count
+        self.sum_rate = 0.0
+        self.sum_rate2 = 0.0
+
+    def _add_interval(self, delta_ns:int, delta_count:int, t_ns:int, count:int) -> None:
+        rate = delta_count / (delta_ns * 1e-9)
+        if self.n == self.size:
+            # evict the oldest interval, its end becomes the beginning of the window
+            old_ns, old_count, old_rate = self.ring[self.head]
+            self.oldest_ns, self.oldest_count = old_ns, old_count
+            self.sum_rate -= old_rate
+            self.sum_rate2 -= old_rate * old_rate
+        else:
+            self.n += 1
+        self.ring[self.head] = (t_ns, count, rate)
+        self.head = (self.head + 1) % self.size
+        self.sum_rate += rate
+        self.sum_rate2 += rate * rate
+
+    def rate(self) -> float|None:
+        if self.n == 0:
+            return self._instant_rate()
+        delta_ns = self.last_ns - self.oldest_ns
+        return (self.last_count - self.oldest_count) / (delta_ns * 1e-9)
+
+    def _relative_error(self) -> float|None:
+        if self.n < 2:
+            return None
+        mean = self.sum_rate / self.n
+        if mean <= 0:
+            return None
+        var = max(0.0, self.sum_rate2 / self.n - mean * mean)
+        return math.sqrt(var / (self.n - 1)) / mean
+
+
+class ExponentialEstimator(Estimator):
+    """
+    Exponentially weighted moving average of the throughput.
+
+    The weight of an interval decays with its age, with a configurable
+    half-life. This smooths bursty workloads much better than a short window
+    while still following slow drifts of the rate.
+
+    Parameters
+    ----------
+    half_life : float, optional
+        Time (in seconds) after which an interval has half of its initial
+        weight. Default is 30.
+    resolution : float, optional
+        Minimal duration (in seconds) of an interval. Default is 0.1.
+    """
+
+    def __init__(self, half_life:float = 30.0, resolution:float = 0.1) -> None:
+        assert half_life > 0, "The half-life must be positive."
+        self.tau_ns = half_life * 1e9 / math.log(2)
+        super().__init__(resolution)
+
+    def start(self, t_ns:int, count:int = 0) -> None:
+        super().start(t_ns, count)
+        self.mean = None
+        self.var = 0.0
+        self.alpha = 1.0
+        self.n = 0
+
+    def _add_interval(self, delta_ns:int, delta_count:int, t_ns:int, count:int) -> None:
+        rate = delta_count / (delta_ns * 1e-9)
+        self.n += 1
+        if self.mean is None:
+            self.mean = rate
+            return
+        # behave like a plain average until enough intervals are seen (warm-up)
+        alpha = self.alpha = max(1.0 - math.exp(-delta_ns / self.tau_ns), 1.0 / self.n)
+        diff = rate - self.mean
+        self.mean += alpha * diff
+        self.var = (1.0 - alpha) * (self.var + alpha * diff * diff)
+
+    def rate(self) -> float|None:
+        if self.mean is None:
+            return self._instant_rate()
+        return self.mean
+
+    def _relative_error(self) -> float|None:
+        if self.n < 2 or self.mean <= 0:
+            return None
+        # standard error of an EWMA of independent samples
+        return math.sqrt(self.var * self.alpha / (2.0 - self.alpha)) / self.mean
+
+
+class GlobalEstimator(Estimator):
+    """
+    Average throughput since the beginning of the run.
+
+    Best suited for long jobs whose items have a stable cost on average but
+    are individually very bursty.
+
+    Parameters
+    ----------
+    resolution : float, optional
+        Minimal duration (in seconds) of an interval. Default is 0.1.
+    """
+
+    def start(self, t_ns:int, count:int = 0) -> None:
+        super().start(t_ns, count)
+        self.n = 0
+        self.mean_rate = 0.0
+        self.m2 = 0.0
+
+    def _add_interval(self, delta_ns:int, delta_count:int, t_ns:int, count:int) -> None:
+        # Welford's online algorithm on the per-interval rates
+        rate = delta_count / (delta_ns * 1e-9)
+        self.n += 1
+        diff = rate - self.mean_rate
+        self.mean_rate += diff / self.n
+        self.m2 += diff * (rate - self.mean_rate)
+
+    def rate(self) -> float|None:
+        return self._instant_rate()
+
+    def _relative_error(self) -> float|None:
+        if self.n < 2 or self.mean_rate <= 0:
+            return None
+        var = self.m2 / (self.n - 1)
+        return math.sqrt(var / self.n) / self.mean_rate
+
+
+Estimator.models = {
+    "window": WindowedEstimator,
+    "ewma": ExponentialEstimator,
+    "global": GlobalEstimator,
+}
+
+
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    # simulate a bursty loop: most items take 1ms, some take 20ms
+    for name in Estimator.models:
+        est = Estimator.from_spec(name)
+        t = time.perf_counter_ns()
+        est.start(t)
+        for i in range(1, 2001):
+            t += 1_000_000 if random.random() > 0.05 else 20_000_000
+            est.update(t, i)
+        eta, spread = est.eta(8000)
+        print(f"{name:>6}: {est.rate():.1f} it/s, eta for 8000 more items: {eta:.1f}s ± {spread:.1f}s")
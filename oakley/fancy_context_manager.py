@@ -1,21 +1,23 @@
 
 import traceback as tb
+import contextvars
 from .fancy_string import cstr
 
 
 
 class FancyCM:
     """
-    Updates some counter on enter/exit.
+    Updates some counter on enter/exit. The counter is local to the thread
+    or asyncio task (see :meth:`MutableClass.propagate`).
     """
-    lvl = 0
+    lvl = contextvars.ContextVar("oakley_lvl", default=0)
     
     def __enter__(self):
-        FancyCM.lvl += 1
+        FancyCM.lvl.set(FancyCM.lvl.get() + 1)
     
     def __exit__(self, exc_type, exc_value, traceback):
-        FancyCM.lvl -= 1
-        if exc_type and FancyCM.lvl == 0:
+        FancyCM.lvl.set(FancyCM.lvl.get() - 1)
+        if exc_type and FancyCM.lvl.get() == 0:
             print(f"Exception occurred: {cstr(exc_type.__name__):r} ({cstr(exc_value):y})")
             tb.print_tb(traceback)
 
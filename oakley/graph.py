@@ -0,0 +1,321 @@
+import io
+import os
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from typing import Literal
+
+from .fancy_string import cstr
+from .fancy_context_manager import FancyCM
+from .mutable_class import MutableClass
+from .message import Message
+from .print_stack import PrintListener, pStack
+
+
+def _run_node(name:str, fn, args:tuple, kwargs:dict, indent:int, lvl:int) -> tuple:
+    """
+    Worker side: run ``fn`` as a `Task` named ``name``, capturing its
+    output. Returns ``(error, result, output, duration)``, the error being
+    ``None`` on success (it is returned rather than raised, to keep the
+    output). ``indent`` and ``lvl`` are the output state of the graph's
+    task, which a worker process does not inherit.
+    """
+    from .task import Task # circular import: the task module exposes the graph
+
+    buffer = PrintListener(io.StringIO())
+    token = pStack.capture.set(buffer)
+    MutableClass.indent.set(indent) # a worker process starts at level 0
+    FancyCM.lvl.set(lvl) # nested in the graph's task: a failure does not print its traceback here
+    error, result = None, None
+    start = time.perf_counter()
+    try:
+        with Task(name):
+            result = fn(*args, **kwargs)
+    except BaseException as e:
+        error = e
+    finally:
+        duration = time.perf_counter() - start
+        buffer.write("") # end the unfinished lines
+        pStack.capture.reset(token)
+    return error, result, buffer.original_stdout.getvalue(), duration
+
+
+class Node:
+    """
+    A task of a :class:`TaskGraph`, returned by :meth:`TaskGraph.add`. Once
+    the graph has run, holds its ``result``, its ``duration``, and its
+    ``earliest_start`` and ``slack`` in the schedule.
+    """
+
+    def __init__(self, name:str, fn, args:tuple, kwargs:dict, dependencies:list) -> None:
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.dependencies = dependencies
+        self.result = None
+        self.duration = None
+        self.earliest_start = None
+        self.slack = None
+
+    def __repr__(self) -> str:
+        return f"Node({self.name!r})"
+
+
+class TaskGraph:
+    """
+    A set of tasks with dependencies, run in parallel on a pool, behind
+    :meth:`Task.graph`.
+
+    Tasks are declared with :meth:`add`; a task starts as soon as all the
+    tasks it depends on are done, on a thread or process pool. A `Node`
+    passed among the arguments of a task is replaced by its result, and is
+    a dependency; ``after`` adds dependencies whose results are not needed.
+    Since a task can only depend on tasks added before it, the graph has no
+    cycle.
+
+    The output of each task (its header, messages and prints) is captured
+    while it runs, and printed in one piece when it is done, so that the
+    outputs of parallel tasks do not interleave. Once every task is done,
+    the *critical path* is printed: the chain of dependent tasks that sets
+    the duration of the run, whatever the number of workers. The *slack* of
+    a task is how much longer it could have taken without delaying the
+    run: speeding up a task with slack gains nothing.
+
+    Parameters
+    ----------
+    msg : str
+        Name of the `Task` under which the graph runs.
+    workers : int, optional
+        Number of workers. Default is the number of CPUs.
+    backend : {"thread", "process"}, optional
+        ``"thread"`` for tasks releasing the GIL (I/O, NumPy...),
+        ``"process"`` for pure Python computations; functions, arguments
+        and results must then be picklable. Default is ``"thread"``.
+
+    Notes
+    -----
+    - The schedule is computed from the measured durations: the earliest
+      start of a task is the time at which its dependencies would be done
+      with unlimited workers.
+    - If a task fails, no other task is started; the running ones are
+      waited for, then the exception is raised.
+    - Progress bars inside the tasks print plain lines (see
+      ``config["display_mode"]``): captured output cannot be redrawn.
+
+    Examples
+    --------
+    >>> graph = Task.graph("Pipeline", workers=4)
+    >>> raw = graph.add("Download", download, url)
+    >>> clean = graph.add("Clean", clean_up, raw)
+    >>> stats = graph.add("Statistics", statistics, raw)
+    >>> graph.add("Report", report, clean, stats)
+    >>> results = graph.run()
+    [~] Pipeline
+     > [~] Download (2.01s)
+     > [~] Statistics (0.50s)
+     > [~] Clean (3.02s)
+     > [~] Report (1.00s)
+     > [c] Critical path: Download → Clean → Report (6.03s, wall time 6.04s, 1.08x parallelism)
+     > [c] task        duration   slack
+     > [c] Download       2.01s  critical
+     > [c] Statistics     500ms   2.52s
+     > [c] Clean          3.02s  critical
+     > [c] Report         1.00s  critical
+     > [~] Task completed after: 6.045s
+    >>> results["Report"]
+    """
+
+    def __init__(self, msg:str, workers:int = None, backend:Literal["thread", "process"] = "thread") -> None:
+        assert backend in ["thread", "process"], f"Invalid backend '{backend}'. Choose among 'thread', 'process'."
+        self.msg = msg
+        self.workers = workers or os.cpu_count() or 1
+        self.backend = backend
+        self.nodes = {} # name -> Node, in the order of declaration
+
+    def add(self, name:str, fn, *args, after:list = (), **kwargs) -> Node:
+        """
+        Declare the task ``name``, running ``fn(*args, **kwargs)``. Returns
+        its `Node`.
+
+        Parameters
+        ----------
+        name : str
+            Name of the task, unique in the graph.
+        fn : callable
+            The function to run.
+        *args, **kwargs
+            Its arguments. Nodes are replaced by their results, and are
+            dependencies of the task.
+        after : list of Node or str, optional
+            Other dependencies (nodes or names), whose results are not
+            passed. Default is none.
+        """
+        assert name not in self.nodes, f"There is already a task named '{name}' in the graph."
+        after = [self.nodes.get(d, d) if isinstance(d, str) else d for d in after]
+        assert all(isinstance(d, Node) for d in after), f"Unknown dependencies of '{name}': {[d for d in after if not isinstance(d, Node)]}."
+        dependencies = []
+        for dependency in [*args, *kwargs.values(), *after]:
+            if isinstance(dependency, Node):
+                assert self.nodes.get(dependency.name) is dependency, f"{dependency} belongs to another graph."
+                if dependency not in dependencies:
+                    dependencies.append(dependency)
+        node = Node(name, fn, args, kwargs, dependencies)
+        self.nodes[name] = node
+        return node
+
+    # --------------- #
+    # !-- Running --! #
+    # --------------- #
+
+    def run(self) -> dict:
+        """
+        Run every task, then print the critical path. Returns ``{name:
+        result}``.
+        """
+        from .task import Task # circular import: the task module exposes the graph
+
+        with Task(self.msg):
+            start = time.perf_counter()
+            self._execute()
+            self._print_critical_path(time.perf_counter() - start)
+        return {name: node.result for name, node in self.nodes.items()}
+
+    def _execute(self) -> None:
+        from .parallel import get_executor # circular import: the parallel helpers use progress bars, which use tasks
+
+        executor = get_executor(self.backend, self.workers)
+        run_node = _run_node if self.backend == "process" else MutableClass.propagate(_run_node)
+        indent, lvl = MutableClass.indentation(), FancyCM.lvl.get()
+
+        pending = list(self.nodes.values()) # in the order of declaration
+        done = set()
+        running = {} # future -> Node
+        error = None
+        try:
+            while pending or running:
+                # 1. Start the tasks whose dependencies are done
+                if error is None:
+                    for node in [node for node in pending if all(d in done for d in node.dependencies)]:
+                        pending.remove(node)
+                        args = [a.result if isinstance(a, Node) else a for a in node.args]
+                        kwargs = {k: v.result if isinstance(v, Node) else v for k, v in node.kwargs.items()}
+                        running[executor.submit(run_node, node.name, node.fn, args, kwargs, indent, lvl)] = node
+                if not running:
+                    break
+
+                # 2. Print the output of the finished ones
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node = running.pop(future)
+                    node_error, node.result, output, node.duration = future.result()
+                    MutableClass.print(output, end="", ignore_tabs=True)
+                    if node_error is not None and error is None:
+                        error = node_error
+                    done.add(node)
+        finally:
+            for future in running: # interrupted: do not start the queued ones
+                future.cancel()
+
+        if error is not None:
+            if pending:
+                Message(f"{len(pending)} task{'s' if len(pending) > 1 else ''} not run: {', '.join(node.name for node in pending)}", "!")
+            raise error
+
+    # --------------------- #
+    # !-- Critical path --! #
+    # --------------------- #
+
+    def _schedule(self) -> list:
+        """
+        Compute the earliest start and the slack of every task from the
+        measured durations, and return the critical path.
+        """
+        nodes = list(self.nodes.values()) # dependencies always come first
+        if not nodes:
+            return []
+        for node in nodes:
+            node.earliest_start = max((d.earliest_start + d.duration for d in node.dependencies), default=0.0)
+        end = max(node.earliest_start + node.duration for node in nodes)
+
+        latest_finish = {node: end for node in nodes}
+        for node in reversed(nodes):
+            latest_start = latest_finish[node] - node.duration
+            node.slack = max(0.0, latest_start - node.earliest_start)
+            for d in node.dependencies:
+                latest_finish[d] = min(latest_finish[d], latest_start)
+
+        node = max(nodes, key=lambda node: node.earliest_start + node.duration)
+        path = [node]
+        while node.dependencies:
+            node = max(node.dependencies, key=lambda d: d.earliest_start + d.duration)
+            path.append(node)
+        return path[::-1]
+
+    def critical_path(self) -> list:
+        """
+        Return the nodes of the critical path, once the graph has run.
+        """
+        assert all(node.duration is not None for node in self.nodes.values()), "The graph has not run."
+        return self._schedule()
+
+    def _print_critical_path(self, wall:float) -> None:
+        path = self._schedule()
+        if not path:
+            return
+        t = MutableClass.precise_time
+        length = path[-1].earliest_start + path[-1].duration
+        work = sum(node.duration for node in self.nodes.values())
+        tag = cstr("[c]").magenta()
+        MutableClass.print(
+            tag, f"Critical path: {' → '.join(node.name for node in path)}",
+            f"({t(length)}, wall time {t(wall)}, {work / wall if wall > 0 else 1:.2f}x parallelism)"
+        )
+
+        width = max(len(name) for name in [*self.nodes, "task"])
+        MutableClass.print(tag, f"{'task'.ljust(width)}  {'duration':>8}  {'slack':>8}")
+        for node in self.nodes.values():
+            slack = cstr("critical".rjust(8)).red() if node in path else t(node.slack).rjust(8)
+            MutableClass.print(tag, f"{node.name.ljust(width)}  {t(node.duration):>8}  {slack}")
+
+
+
+if __name__ == '__main__':
+    from .task import Task
+
+    def download(url):
+        Message(f"Downloading {url}")
+        time.sleep(1)
+        return list(range(10))
+
+    def clean(data):
+        time.sleep(1.5)
+        return [x for x in data if x % 2]
+
+    def statistics(data):
+        time.sleep(0.5)
+        print("Computing statistics")
+        return sum(data) / len(data)
+
+    def report(data, mean):
+        time.sleep(0.5)
+        return f"{len(data)} values, mean {mean}"
+
+    graph = Task.graph("Pipeline", workers=4)
+    raw = graph.add("Download", download, "example.com/data.csv")
+    cleaned = graph.add("Clean", clean, raw)
+    mean = graph.add("Statistics", statistics, raw)
+    graph.add("Report", report, cleaned, mean)
+    print(graph.run()["Report"])
+
+    def broken():
+        time.sleep(0.2)
+        raise ValueError("No data")
+
+    graph = Task.graph("Broken pipeline", workers=2)
+    data = graph.add("Load", broken)
+    graph.add("Slow", time.sleep, 0.5)
+    graph.add("Analyse", clean, data)
+    try:
+        graph.run()
+    except ValueError:
+        Message("The pipeline failed as expected", "#")
@@ -0,0 +1,297 @@
+import os
+import time
+import atexit
+import sqlite3
+import statistics
+import threading
+
+from .config import config
+from .message import Message
+
+
+class History:
+    """
+    Opt-in, local database of past runs of tasks and progress bars.
+
+    Once enabled, the duration of every completed `Task` (keyed by its
+    message) and the duration and size of every completed, named
+    `ProgressBar` (``ProgressBar(..., name="...")``) are stored in a SQLite
+    file. They are used to:
+
+    - seed the ETA of a progress bar with the throughput of its previous
+      runs, so that the first seconds of a run are not pure noise;
+    - show how long a task took compared to its last run:
+      ``[~] Load data (2.10s, +12% vs. last run)``;
+    - warn when a task or a bar is slower than usual, i.e. slower than the
+      median of its last :attr:`n_runs` runs by more than
+      ``config["regression_threshold"]`` (30% by default).
+
+    Parameters are set through the config: ``config["history"]`` is the
+    path of the database (``None`` disables the history), see
+    :meth:`enable` and :meth:`disable`.
+
+    Notes
+    -----
+    - The history is shared by all the processes and threads using the same
+      file; writes are serialized by SQLite.
+    - Recording a run only queues it: a background thread writes the queue
+      to the database, and it is written at exit. Reads include the runs
+      still in the queue. If a write fails (unwritable path, database
+      locked for too long...), a warning is printed once per path and the
+      runs stay queued until the next write.
+    - Only runs that completed are recorded: aborted tasks and bars left
+      with ``break`` are not.
+
+    Examples
+    --------
+    >>> History.enable() # once, the setting is saved in the config
+    >>> with Task("Load data"):
+    ...     load()
+    [~] Load data (2.10s, +12% vs. last run)
+    >>> History.runs("task", "Load data")
+    [(1718030400.0, 2.1, None), (1717944000.0, 1.87, None)]
+    """
+
+    n_runs = 5 # number of past runs used for the "usual" duration and throughput
+    default_path = os.path.join(os.path.expanduser("~"), ".oakley_history.sqlite")
+
+    _connection = None
+    _connection_path = None
+    _lock = threading.Lock() # the connection
+    _pending = [] # (path, row) recorded and not written yet
+    _pending_lock = threading.Lock()
+    _wake = threading.Event()
+    _writer = None # thread writing the pending rows
+    _failed_paths = set() # paths whose write failure was reported
+
+    # ------------------ #
+    # !-- Activation --! #
+    # ------------------ #
+
+    @staticmethod
+    def enable(path:str = None) -> None:
+        """
+        Enable the history, stored at ``path`` (default is
+        ``~/.oakley_history.sqlite``). The setting is saved in the config.
+        """
+        config["history"] = os.path.abspath(os.path.expanduser(path or History.default_path))
+
+    @staticmethod
+    def disable() -> None:
+        """
+        Disable the history. The database file is kept.
+        """
+        config["history"] = None
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(config["history"])
+
+    @staticmethod
+    def _db(path:str = None) -> sqlite3.Connection|None:
+        """
+        Return the connection to the database at ``path`` (default is the
+        configured one), (re)opened if the path changed. Must be called
+        under ``History._lock``.
+        """
+        path = path or config["history"]
+        if not path:
+            return None
+        if History._connection_path != path:
+            if History._connection is not None:
+                History._connection.close()
+                History._connection, History._connection_path = None, None
+            connection = sqlite3.connect(path, timeout=5, check_same_thread=False) # threads are serialized by History._lock
+            connection.execute("PRAGMA journal_mode=WAL") # readers do not block the writer (several processes)
+            connection.execute("PRAGMA synchronous=NORMAL") # no fsync per run
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS runs (kind TEXT, key TEXT, started REAL, duration REAL, count INTEGER)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS runs_by_key ON runs (kind, key, started)")
+            History._connection, History._connection_path = connection, path
+        return History._connection
+
+    # ------------------ #
+    # !-- Read/Write --! #
+    # ------------------ #
+
+    @staticmethod
+    def record(kind:str, key:str, duration:float, count:int = None) -> None:
+        """
+        Store a completed run of the task or bar ``key``. ``kind`` is
+        ``"task"`` or ``"bar"``. The run is queued, and written by a
+        background thread: this never waits for the disk.
+        """
+        path = config["history"]
+        if not path:
+            return
+        with History._pending_lock:
+            History._pending.append((path, (kind, key, time.time() - duration, duration, count)))
+            if History._writer is None:
+                History._writer = threading.Thread(target=History._write_loop, name="oakley-history", daemon=True)
+                History._writer.start()
+        History._wake.set()
+
+    @staticmethod
+    def _write_loop() -> None:
+        try:
+            while True:
+                History._wake.wait()
+                History._wake.clear()
+                History.flush()
+        finally: # the next record starts a new writer
+            with History._pending_lock:
+                History._writer = None
+
+    @staticmethod
+    def flush() -> None:
+        """
+        Write the queued runs to the database (done at exit).
+        """
+        with History._lock: # also waits for the write in progress, if any
+            with History._pending_lock:
+                pending, History._pending = History._pending, []
+            by_path = {}
+            for path, row in pending:
+                by_path.setdefault(path, []).append(row)
+            for path, rows in by_path.items():
+                try:
+                    db = History._db(path)
+                    with db: # a single commit
+                        db.executemany("INSERT INTO runs VALUES (?, ?, ?, ?, ?)", rows)
+                except (sqlite3.Error, OSError) as e:
+                    with History._pending_lock: # retried at the next write
+                        History._pending[:0] = [(path, row) for row in rows]
+                    if path not in History._failed_paths:
+                        History._failed_paths.add(path)
+                        Message(f"Could not write the history to '{path}' ({e}): the runs stay queued", "!")
+
+    @staticmethod
+    def _after_fork() -> None:
+        History._pending = [] # written by the parent
+        History._pending_lock = threading.Lock()
+        History._lock = threading.Lock()
+        History._wake = threading.Event()
+        History._writer = None
+
+    @staticmethod
+    def runs(kind:str, key:str, n:int = None) -> list:
+        """
+        Return the ``n`` (default :attr:`n_runs`) most recent runs of
+        ``key``, newest first, as ``(started, duration, count)`` tuples.
+        """
+        n = n or History.n_runs
+        with History._lock: # rows move from the queue to the database under this lock
+            db = History._db()
+            if db is None:
+                return []
+            rows = db.execute(
+                "SELECT started, duration, count FROM runs WHERE kind = ? AND key = ? ORDER BY started DESC LIMIT ?",
+                (kind, key, n)
+            ).fetchall()
+            with History._pending_lock:
+                rows += [
+                    row[2:] for path, row in History._pending
+                    if path == History._connection_path and row[0] == kind and row[1] == key
+                ]
+        return sorted(rows, reverse=True)[:n]
+
+    # ---------------- #
+    # !-- Analysis --! #
+    # ---------------- #
+
+    @staticmethod
+    def rate(key:str) -> tuple[float, float|None]|None:
+        """
+        Usual throughput of the bar ``key``, from its last runs.
+
+        Returns
+        -------
+        tuple of (float, float or None), or None
+            ``(rate, relative spread)`` where ``rate`` is the median number of
+            items per second, and the spread the relative standard deviation
+            across runs (``None`` with a single run). ``None`` if there is no
+            past run.
+        """
+        rates = [count / duration for _, duration, count in History.runs("bar", key) if count and duration > 0]
+        if not rates:
+            return None
+        rate = statistics.median(rates)
+        spread = statistics.stdev(rates) / rate if len(rates) > 1 and rate > 0 else None
+        return rate, spread
+
+    @staticmethod
+    def compare(kind:str, key:str, duration:float, count:int = None) -> tuple[float|None, float|None, float|None]:
+        """
+        Compare a run that just completed (not recorded yet) with the past
+        runs of ``key``. When ``count`` is given, durations are compared per
+        item (bars of different sizes).
+
+        Returns
+        -------
+        tuple
+            ``(delta, usual, regression)``:
+
+            - ``delta``: relative change compared to the last run
+              (``0.12`` means 12% slower), ``None`` if there is none;
+            - ``usual``: median duration of the last runs, scaled to
+              ``count`` items if given, ``None`` if there is none;
+            - ``regression``: relative slowdown compared to ``usual`` if it
+              exceeds ``config["regression_threshold"]``, else ``None``.
+        """
+        past = [
+            d * count / c if count else d
+            for _, d, c in History.runs(kind, key)
+            if not count or c
+        ]
+        if not past:
+            return None, None, None
+        delta = duration / past[0] - 1 if past[0] > 0 else None
+        usual = statistics.median(past)
+        slowdown = duration / usual - 1 if usual > 0 else 0.0
+        regression = slowdown if slowdown > config["regression_threshold"] else None
+        return delta, usual, regression
+
+    @staticmethod
+    def clear(kind:str = None, key:str = None) -> None:
+        """
+        Forget the past runs of ``key`` (all keys if ``None``), of ``kind``
+        (both kinds if ``None``).
+        """
+        History.flush() # the queued runs are forgotten too
+        with History._lock:
+            db = History._db()
+            if db is None:
+                return
+            with db:
+                db.execute(
+                    "DELETE FROM runs WHERE (? IS NULL OR kind = ?) AND (? IS NULL OR key = ?)",
+                    (kind, kind, key, key)
+                )
+
+
+atexit.register(History.flush)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=History._after_fork)
+
+
+
+if __name__ == '__main__':
+    import tempfile
+    from .task import Task
+    from .progress_bar import ProgressBar
+    from .message import Message
+
+    previous_path = config["history"]
+    History.enable(os.path.join(tempfile.mkdtemp(), "history.sqlite"))
+
+    for run, delay in enumerate([0.010, 0.011, 0.010, 0.016]): # the last run regresses
+        Message(f"Run {run + 1}", "#")
+        with Message.tab():
+            with Task("Sleeping"):
+                time.sleep(50 * delay)
+            for i in ProgressBar(range(50), name="Sleeping loop"):
+                time.sleep(delay)
+
+    Message("Past runs of 'Sleeping':").list(History.runs("task", "Sleeping"))
+    config["history"] = previous_path
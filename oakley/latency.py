@@ -0,0 +1,191 @@
+import heapq
+
+
+_SUB_BITS = 4 # 16 sub-buckets per power of two: at most 6.25% of relative error
+_SUB = 1 << _SUB_BITS
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory histogram of latencies, with the slowest items.
+
+    Latencies (in nanoseconds) are counted in log-spaced buckets: each power
+    of two is split into 16 buckets, so that any latency from 1ns to
+    several centuries is stored with less than 6.25% of relative error, in
+    1024 counters. Recording a value is a few integer operations, and the
+    ``k`` slowest values are kept in a min-heap together with the index of
+    their item.
+
+    Parameters
+    ----------
+    k : int, optional
+        Number of slowest items to keep. Default is 5.
+
+    Examples
+    --------
+    >>> hist = LatencyHistogram()
+    >>> for i, item in enumerate(items):
+    ...     start = time.perf_counter_ns()
+    ...     process(item)
+    ...     hist.record(time.perf_counter_ns() - start, i)
+    >>> hist.quantile(0.99) # in seconds
+    0.0213
+    >>> hist.slowest()
+    [(512, 0.0251), (87, 0.0240), ...]
+    """
+
+    def __init__(self, k:int = 5) -> None:
+        assert k >= 0, "The number of slowest items must be positive."
+        self.k = k
+        self.counts = [0] * (64 * _SUB)
+        self.n = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.min_ns = 1 << 63
+        self.heap = [] # (latency, index) of the k slowest items, the fastest of them first
+        self.threshold = -1 # only latencies above this one can enter the heap (or be the max)
+
+    def record(self, ns:int, index:int = None) -> None:
+        """
+        Record a latency of ``ns`` nanoseconds, for the item ``index``.
+        """
+        if ns >= _SUB:
+            shift = ns.bit_length() - _SUB_BITS - 1
+            self.counts[((shift + 1) << _SUB_BITS) + ((ns >> shift) & (_SUB - 1))] += 1
+        else:
+            self.counts[ns if ns > 0 else 0] += 1
+        self.n += 1
+        self.total_ns += ns
+        if ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.threshold: # rare once the heap is full
+            self._push(ns, index)
+
+    def record_many(self, durations:list) -> None:
+        """
+        Record a batch of latencies (in ns), without item indices. Faster
+        than calling :meth:`record` for each of them.
+        """
+        if not durations:
+            return
+        counts = self.counts
+        for ns in durations:
+            if ns >= _SUB:
+                shift = ns.bit_length() - _SUB_BITS - 1
+                counts[((shift + 1) << _SUB_BITS) + ((ns >> shift) & (_SUB - 1))] += 1
+            else:
+                counts[ns if ns > 0 else 0] += 1
+        self.n += len(durations)
+        self.total_ns += sum(durations)
+        self.min_ns = min(self.min_ns, min(durations))
+        longest = max(durations)
+        if longest > self.threshold:
+            for ns in durations:
+                if ns > self.threshold:
+                    self._push(ns, None)
+    
+    def _push(self, ns:int, index:int) -> None:
+        if ns > self.max_ns:
+            self.max_ns = ns
+        heap = self.heap
+        if len(heap) < self.k:
+            heapq.heappush(heap, (ns, index))
+        elif self.k:
+            heapq.heapreplace(heap, (ns, index))
+        if self.k == 0:
+            self.threshold = self.max_ns
+        elif len(heap) == self.k:
+            self.threshold = heap[0][0]
+
+    @staticmethod
+    def _bucket_bounds(bucket:int) -> tuple[int, int]:
+        """
+        Return the ``[low, high)`` range of latencies (in ns) of a bucket.
+        """
+        if bucket < _SUB:
+            return bucket, bucket + 1
+        shift = (bucket >> _SUB_BITS) - 1
+        low = (_SUB + (bucket & (_SUB - 1))) << shift
+        return low, low + (1 << shift)
+
+    # ---------------- #
+    # !-- Analysis --! #
+    # ---------------- #
+
+    def quantile(self, q:float) -> float|None:
+        """
+        Return the ``q``-quantile (``0.99`` for p99) in seconds, ``None`` if
+        nothing was recorded.
+        """
+        assert 0 <= q <= 1, "The quantile must be between 0 and 1."
+        if self.n == 0:
+            return None
+        target = q * self.n
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                low, high = LatencyHistogram._bucket_bounds(bucket)
+                return min(max((low + high) / 2, self.min_ns), self.max_ns) * 1e-9
+        return self.max_ns * 1e-9
+
+    def tail_share(self, fraction:float = 0.01) -> float|None:
+        """
+        Return the share of the total time spent in the slowest
+        ``fraction`` of the items (estimated from the buckets).
+        """
+        if self.n == 0 or self.total_ns == 0:
+            return None
+        remaining = max(1.0, fraction * self.n)
+        tail_ns = 0.0
+        for bucket in range(len(self.counts) - 1, -1, -1):
+            count = self.counts[bucket]
+            if not count:
+                continue
+            low, high = LatencyHistogram._bucket_bounds(bucket)
+            taken = min(count, remaining)
+            tail_ns += taken * min((low + high) / 2, self.max_ns)
+            remaining -= taken
+            if remaining <= 0:
+                break
+        return min(1.0, tail_ns / self.total_ns)
+
+    def slowest(self) -> list:
+        """
+        Return the slowest items as ``(index, seconds)`` pairs, slowest first.
+        """
+        return [(index, ns * 1e-9) for ns, index in sorted(self.heap, reverse=True)]
+
+    def summary(self) -> dict:
+        """
+        Return the main statistics, in seconds.
+        """
+        return {
+            "count": self.n,
+            "mean": self.total_ns / self.n * 1e-9 if self.n else None,
+            "min": self.min_ns * 1e-9 if self.n else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max_ns * 1e-9 if self.n else None,
+            "tail_share": self.tail_share(0.01),
+            "slowest": self.slowest(),
+        }
+
+
+
+if __name__ == '__main__':
+    import time
+    import random
+
+    hist = LatencyHistogram()
+    for i in range(100_000):
+        hist.record(1_000_000 if random.random() > 0.01 else random.randint(20_000_000, 50_000_000), i)
+    print(hist.summary())
+
+    n = 1_000_000
+    start = time.perf_counter()
+    for i in range(n):
+        hist.record(1234567, i)
+    print(f"record: {(time.perf_counter() - start) / n * 1e9:.0f}ns per call")
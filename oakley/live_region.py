@@ -0,0 +1,232 @@
+import re
+import time
+import threading
+
+from .mutable_class import MutableClass
+from .print_stack import pStack, in_notebook
+from .config import config
+from .terminal import Terminal
+
+
+_ANSI_TOKEN_RE = re.compile(r'(\033\[[0-9;]*m)')
+
+
+def _truncate(line:str, width:int) -> str:
+    """
+    Cut ``line`` to ``width`` visible characters, keeping its ANSI codes.
+    """
+    out = []
+    visible = 0
+    for token in _ANSI_TOKEN_RE.split(line):
+        if token.startswith("\033["):
+            out.append(token)
+            continue
+        if visible + len(token) > width:
+            out.append(token[:width - visible])
+            out.append("\033[0m") # the cut may have happened inside a colored part
+            break
+        out.append(token)
+        visible += len(token)
+    return "".join(out)
+
+
+class LiveRegion(MutableClass):
+    """
+    A block of terminal lines, at the bottom of the output, that is
+    redrawn in place at a fixed frame rate.
+
+    While a `LiveRegion` is active, every `ProgressBar` and every `Task`
+    gets its own line in the region instead of printing on a single line
+    with ``'\\r'``. Several bars (an outer epoch bar and an inner batch bar,
+    or one bar per worker thread) can therefore run at the same time
+    without overwriting each other. Everything else that is printed
+    (`Message`, ``print``...) scrolls above the region: the region is erased
+    before the text is written, and drawn again right after.
+
+    Once a bar or a task is done, its final line is printed above the
+    region, like any other output, and its live line disappears.
+
+    Parameters
+    ----------
+    fps : float, optional
+        Maximal number of redraws per second. Default is 20. The frame rate
+        is lowered if drawing takes more than ``config["overhead_budget"]``
+        of the time (e.g. on a slow SSH connection).
+
+    Notes
+    -----
+    - The region relies on ANSI cursor movements. In notebooks, or when
+      the output is not a terminal (see ``config["display_mode"]``), it is
+      disabled and bars and tasks behave as usual.
+    - Live lines are truncated to the terminal width, so that they never
+      wrap (which would break the cursor movements).
+
+    Examples
+    --------
+    >>> with LiveRegion():
+    ...     for epoch in ProgressBar(range(10)):
+    ...         for batch in ProgressBar(range(100)):
+    ...             ...
+    ...         Message(f"Epoch {epoch} done")
+    """
+
+    active = None # the LiveRegion currently owning the bottom of the terminal
+
+    def __init__(self, fps:float = 20) -> None:
+        assert fps > 0, "The frame rate must be positive."
+        self.fps = fps
+        self.items = [] # (object with a _live_line method, indentation prefix)
+        self.drawn = 0 # number of lines currently on screen
+        self.previous_lines = []
+        self.interval = 1 / fps # adapted to the cost of drawing
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def supported() -> bool:
+        """
+        Whether the current output can host a live region.
+        """
+        return not in_notebook and Terminal.interactive()
+
+    @staticmethod
+    def current() -> 'LiveRegion|None':
+        """
+        Return the active live region, or ``None`` (always while the output
+        is captured: captured lines cannot be redrawn).
+        """
+        if pStack.capturing():
+            return None
+        return LiveRegion.active
+
+    # ----------------------- #
+    # !-- Context Manager --! #
+    # ----------------------- #
+
+    def __enter__(self) -> 'LiveRegion':
+        if LiveRegion.active is None and LiveRegion.supported():
+            LiveRegion.active = self
+            pStack.region = self
+            self._stop.clear()
+            self._thread = threading.Thread(target=MutableClass.propagate(self._loop), name="oakley-live-region", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        if LiveRegion.active is not self:
+            return
+        self._stop.set()
+        self._thread.join()
+        with pStack.lock:
+            self.draw() # last frame stays on screen
+            pStack.region = None
+            LiveRegion.active = None
+            self.drawn = 0
+            self.items = []
+
+    # ------------- #
+    # !-- Items --! #
+    # ------------- #
+
+    def add(self, item) -> None:
+        """
+        Give ``item`` a line in the region. ``item`` must implement
+        ``_live_line() -> str``. The current indentation is kept.
+        """
+        indent = MutableClass.indentation()
+        prefix = " " + ">" * indent + " " if indent > 0 else ""
+        with pStack.lock:
+            self.items.append((item, prefix))
+            self.draw()
+
+    def hosts(self, item) -> bool:
+        """
+        Whether ``item`` has a line in the region.
+        """
+        return any(other is item for other, _ in self.items)
+
+    def remove(self, item) -> None:
+        """
+        Remove the line of ``item``. Use under ``pStack.lock`` together with
+        the print of the final line, so that nothing happens in between.
+        """
+        with pStack.lock:
+            self.items = [(other, prefix) for other, prefix in self.items if other is not item]
+            self.draw()
+
+    # --------------- #
+    # !-- Drawing --! #
+    # --------------- #
+
+    def _loop(self) -> None:
+        frame_cost = 0.0
+        while not self._stop.wait(self.interval):
+            start_time = time.perf_counter()
+            with pStack.lock:
+                self.draw()
+            # keep the time spent drawing under the overhead budget
+            frame_cost = 0.8 * frame_cost + 0.2 * (time.perf_counter() - start_time)
+            self.interval = max(1 / self.fps, frame_cost / config["overhead_budget"])
+
+    def erase(self) -> None:
+        """
+        Remove the region from the screen, leaving the cursor where it began.
+        Called (under ``pStack.lock``) before anything else is written.
+        """
+        if self.drawn > 0:
+            pStack.original_stdout.write(f"\033[{self.drawn}F\033[J")
+            self.drawn = 0
+            self.previous_lines = []
+
+    def draw(self) -> None:
+        """
+        Redraw the region in place. Must be called under ``pStack.lock``.
+        """
+        if MutableClass.muted():
+            return
+        pStack.write("") # flush the spirits: unfinished lines must be ended first
+        if not pStack.at_line_start:
+            return # someone is in the middle of a line, wait until it is finished
+
+        width = max(1, Terminal.width(ignore_config=True) - 1)
+        lines = [_truncate(prefix + item._live_line(), width) for item, prefix in self.items]
+        if lines == self.previous_lines:
+            return
+
+        out = f"\033[{self.drawn}F" if self.drawn > 0 else ""
+        for line in lines:
+            out += line + "\033[K\n"
+        if len(lines) < self.drawn:
+            out += "\033[J" # the region got smaller
+        pStack.original_stdout.write(out)
+        pStack.original_stdout.flush()
+        self.drawn = len(lines)
+        self.previous_lines = lines
+
+
+
+if __name__ == '__main__':
+    import time
+    from .live_region import LiveRegion # run with -m, this file is a second copy of the module: use the one the bars see
+    from .progress_bar import ProgressBar
+    from .message import Message
+    from .task import Task
+
+    with LiveRegion():
+        with Task("Training"):
+            for epoch in ProgressBar(range(3)):
+                for batch in ProgressBar(range(100)):
+                    time.sleep(0.01)
+                Message(f"Epoch {epoch} done", "#")
+
+    Message.par()
+    from concurrent.futures import ThreadPoolExecutor
+
+    def worker(i):
+        with Task(f"Worker {i}"):
+            for _ in ProgressBar(range(50 + 30 * i)):
+                time.sleep(0.02)
+
+    with LiveRegion():
+        with ThreadPoolExecutor(3) as pool:
+            list(pool.map(worker, range(3)))
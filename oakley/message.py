@@ -185,7 +185,7 @@ class Message(MutableClass):
         self.print(
             self._get_prefix(), self.msg
         )
-        
+    
     def _get_prefix(self) -> str:
         """
         Return the ANSI colored prefix corresponding to the message type.
@@ -2,6 +2,9 @@
 from .fancy_string import cstr
 from .fancy_context_manager import FancyCM
 from .print_stack import pStack, Spirit
+import asyncio
+import functools
+import contextvars
 
 
 
@@ -24,10 +27,16 @@ class MutableClass(FancyCM):
 
     Notes
     -----
-    All muting and indentation state is *global* at the class level, not per
+    All muting and indentation state is shared by all classes, not per
     instance. This means that nested utilities (e.g., `Message` inside a `Task`)
     remain synchronized.
 
+    This state lives in ``contextvars``: each thread and each asyncio task
+    has its own indentation and mute level, so that workers running in
+    parallel do not garble each other's output. A new thread starts at
+    level 0 and unmuted; use :meth:`propagate` to run a function in a worker
+    thread with the state of the caller.
+
     Indentation contexts increment the indentation level on entry and decrement on
     exit. Muting contexts suppress all printing except when explicitly overridden
     through keyword arguments in :meth:`print`.
@@ -81,9 +90,9 @@ class MutableClass(FancyCM):
     '2025-03-19 15:42:10'
 """
     
-    mute_count = 0
+    mute_count = contextvars.ContextVar("oakley_mute_count", default=0)
     idx = 0
-    indent = 0
+    indent = contextvars.ContextVar("oakley_indent", default=0)
     
     
     # -------------- #
@@ -101,7 +110,7 @@ class MutableClass(FancyCM):
             ``True`` if the global mute counter is greater than zero,
             indicating that all output should be suppressed.
         """
-        return MutableClass.mute_count > 0
+        return MutableClass.mute_count.get() > 0
     
     @staticmethod
     def mute() -> FancyCM:
@@ -124,7 +133,7 @@ class MutableClass(FancyCM):
         ...     MutableClass.print("Hidden")
         >>> MutableClass.print("Visible")
         """
-        MutableClass.mute_count += 1
+        MutableClass.mute_count.set(MutableClass.mute_count.get() + 1)
         
         class MuteContext(FancyCM):
             def __exit__(self, *args):
@@ -140,7 +149,7 @@ class MutableClass(FancyCM):
 
         When the counter reaches zero, printing is no longer suppressed.
         """
-        MutableClass.mute_count -= 1
+        MutableClass.mute_count.set(MutableClass.mute_count.get() - 1)
         
     
     # ------------------- #    
@@ -168,7 +177,7 @@ class MutableClass(FancyCM):
         ...     MutableClass.print("Indented")
             > Indented
         """
-        MutableClass.indent += 1
+        MutableClass.indent.set(MutableClass.indent.get() + 1)
         
         class TabContext(FancyCM):
             def __exit__(self, *args):
@@ -185,7 +194,56 @@ class MutableClass(FancyCM):
         Indentation cannot go below zero. Used internally by the
         indentation context manager.
         """
-        MutableClass.indent -= 1
+        MutableClass.indent.set(MutableClass.indent.get() - 1)
+    
+    @staticmethod
+    def indentation() -> int:
+        """
+        Return the current indentation level.
+        """
+        return MutableClass.indent.get()
+    
+    
+    # ------------------------- #
+    # !-- Threads and Tasks --! #
+    # ------------------------ #
+    
+    @staticmethod
+    def propagate(fn):
+        """
+        Wrap ``fn`` so that it runs with the output state of the caller
+        (indentation, mute level, running tasks), whatever the thread it
+        is called from.
+
+        Each call runs in its own copy of the state captured here: workers
+        do not see each other's changes, and the caller does not see theirs.
+
+        Examples
+        --------
+        >>> with Task("Download"):
+        ...     with ThreadPoolExecutor(8) as pool:
+        ...         pool.map(Task.propagate(download), urls) # messages of download() are indented under the task
+        """
+        context = contextvars.copy_context()
+        
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            return context.copy().run(fn, *args, **kwargs)
+        return run
+    
+    @staticmethod
+    async def _in_thread(fn, *args):
+        """
+        Run ``fn(*args)`` in a worker thread, like ``asyncio.to_thread``,
+        then adopt the output state it left (e.g. the indentation added by
+        ``__enter__``) in the current context.
+        """
+        context = contextvars.copy_context()
+        result = await asyncio.get_running_loop().run_in_executor(None, context.run, fn, *args)
+        for var, value in context.items():
+            if var.name.startswith("oakley_"):
+                var.set(value)
+        return result
     
     def __enter__(self):
         """
@@ -245,6 +303,10 @@ class MutableClass(FancyCM):
         Printing is suppressed when the class is muted, unless
         ``ignore_mute=True`` is provided.
 
+        The output is flushed after each call; once
+        :class:`oakley.OutputWriter` is enabled, this only queues it for the
+        writer thread, and never waits for the terminal.
+
         Examples
         --------
         >>> MutableClass.print("Hello")
@@ -273,9 +335,11 @@ class MutableClass(FancyCM):
         if MutableClass.muted() and not ignore_mute:
             return
         
-        if MutableClass.indent > 0 and not ignore_tabs:
-            print(" " + ">" * MutableClass.indent, end=" ")
-        print(*args, **kwargs)
+        with pStack.lock: # keep the indentation and the message together if a renderer thread is running
+            indent = MutableClass.indent.get()
+            if indent > 0 and not ignore_tabs:
+                print(" " + ">" * indent, end=" ")
+            print(*args, **kwargs)
         
     
     @staticmethod
@@ -393,9 +457,28 @@ class MutableClass(FancyCM):
             return f"{value:.3f}"
         else:
             return f"{value:.2e}"
-        
     
+    @staticmethod
+    def bytes(value:float) -> str:
+        """
+        Format a number of bytes with binary prefixes.
         
+        Examples
+        --------
+        >>> MutableClass.bytes(512)
+        '512 B'
+        >>> MutableClass.bytes(1536)
+        '1.50 KB'
+        >>> MutableClass.bytes(3 * 1024**3)
+        '3.00 GB'
+        """
+        for unit in ["B", "KB", "MB", "GB", "TB"]:
+            if abs(value) < 1024 or unit == "TB":
+                break
+            value /= 1024
+        if unit == "B":
+            return f"{value:.0f} B"
+        return f"{value:.2f} {unit}"
     
     @staticmethod
     def time(seconds:float) -> str:
@@ -430,6 +513,57 @@ class MutableClass(FancyCM):
         else:
             return f"{seconds:.3f}s"
     
+    @staticmethod
+    def short_time(seconds:float) -> str:
+        """
+        Convert a duration in seconds into a compact string, keeping only
+        the two most significant units.
+
+        Examples
+        --------
+        >>> MutableClass.short_time(30.4)
+        '30s'
+        >>> MutableClass.short_time(252)
+        '4m12s'
+        >>> MutableClass.short_time(4000)
+        '1h06m'
+        >>> MutableClass.short_time(0.123)
+        '0.12s'
+        """
+        if seconds < 10:
+            return f"{seconds:.2f}s" if seconds < 1 else f"{seconds:.1f}s"
+        seconds = int(round(seconds))
+        if seconds < 60:
+            return f"{seconds}s"
+        if seconds < 3600:
+            return f"{seconds // 60}m{seconds % 60:02d}s"
+        return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m"
+    
+    @staticmethod
+    def precise_time(seconds:float) -> str:
+        """
+        Convert a (short) duration in seconds into a string with an adapted
+        unit, e.g. for latencies.
+
+        Examples
+        --------
+        >>> MutableClass.precise_time(0.000000850)
+        '850ns'
+        >>> MutableClass.precise_time(0.0000123)
+        '12.3µs'
+        >>> MutableClass.precise_time(0.00105)
+        '1.05ms'
+        >>> MutableClass.precise_time(2.3)
+        '2.30s'
+        >>> MutableClass.precise_time(0.9996)
+        '1.00s'
+        """
+        for unit, scale in [("s", 1), ("ms", 1e-3), ("µs", 1e-6)]:
+            if seconds >= scale * 0.9995: # what rounds to 1.00 of a unit is shown in it, never as 1000 of the next one
+                value = seconds / scale
+                return f"{value:.2f}{unit}" if value < 9.995 else f"{value:.1f}{unit}" if value < 99.95 else f"{value:.0f}{unit}"
+        return f"{seconds * 1e9:.0f}ns"
+    
     @staticmethod
     def date() -> str:
         """
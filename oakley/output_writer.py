@@ -0,0 +1,328 @@
+import os
+import re
+import sys
+import time
+import atexit
+import threading
+
+from .config import config
+from .print_stack import pStack
+
+
+_FULL_FRAME_RE = re.compile(r'\r(?!\033\[[0-9]*C)') # a '\r' starting a whole new frame (not an incremental one)
+_CURSOR_RE = re.compile(r'\033\[[0-9;]*[^0-9;mKC]') # escape codes moving the cursor to other lines, or erasing them
+
+
+class OutputWriter:
+    """
+    Write the output from a background thread, so that a slow terminal
+    never blocks the computation.
+
+    Over SSH, or when piped into a slow consumer (``tee``, a log
+    collector...), every ``print`` waits until the text is written: a loop
+    updating a progress bar can spend more time on the terminal than on its
+    work. Once enabled (see :meth:`enable`), the writes of every oakley
+    display and of ``print`` are appended to a queue, and a writer thread
+    writes them in batches: if the consumer falls behind, everything
+    written meanwhile goes out in a single write.
+
+    While coalescing, the progress bar frames superseded by a later frame
+    of the same line (a ``'\\r'`` redrawing the whole line) are dropped: a
+    slow terminal only receives the most recent state of a bar, not every
+    frame it missed. Nothing else is dropped, and the order of the writes
+    is kept.
+
+    The queue is written before an uncaught exception is printed (in any
+    thread), and at exit; afterwards, writes are synchronous again. A write
+    blocks while more than :attr:`max_pending` characters are waiting.
+
+    Parameters
+    ----------
+    stream : file-like
+        The stream written by the thread.
+
+    Notes
+    -----
+    - Text written directly to ``sys.stderr`` (e.g. by ``logging``) is not
+      queued: it can appear before stdout text written just before it.
+    - A write error of the thread (e.g. a closed pipe) is raised by the
+      next write.
+    - In a process forked from this one, the queue starts empty, with a new
+      thread.
+
+    Examples
+    --------
+    >>> OutputWriter.enable() # saved in the config
+    >>> for batch in ProgressBar(batches):
+    ...     train(batch) # never waits for the terminal
+    """
+
+    latency = 0.005 # seconds the thread waits after the first write, to batch the next ones
+    max_pending = 1 << 20 # characters queued above which writes block
+
+    active = None # the OutputWriter installed on pStack, if any
+    _previous_hooks = None # sys.excepthook and threading.excepthook, before they were wrapped
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.frames_dropped = 0 # number of superseded progress bar frames
+        self._reset()
+
+    def _reset(self) -> None:
+        self._cond = threading.Condition()
+        self._pending = [] # strings written and not yet handed to the thread
+        self._pending_size = 0
+        self._busy = False # the thread is writing a batch
+        self._closed = False
+        self._error = None
+        self._thread = None
+        self._pid = os.getpid()
+
+    # --------------- #
+    # !-- Writing --! #
+    # --------------- #
+
+    def write(self, message:str) -> int:
+        if not message:
+            return 0
+        if self._pid != os.getpid(): # forked: the lock and the thread belong to the parent
+            self._reset()
+        with self._cond:
+            if self._error is not None:
+                raise self._error
+            if self._closed:
+                return self.stream.write(message)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="oakley-output-writer", daemon=True)
+                self._thread.start()
+            while self._pending_size > self.max_pending and self._error is None:
+                self._cond.wait()
+            self._pending.append(message)
+            self._pending_size += len(message)
+            self._cond.notify_all()
+        return len(message)
+
+    def flush(self) -> None:
+        """
+        Does nothing: the thread writes the queue as soon as it can. See
+        :meth:`drain` to wait until it is written.
+        """
+        if self._closed:
+            self.stream.flush()
+
+    def drain(self, timeout:float = None) -> bool:
+        """
+        Wait until everything written so far is on the stream. Returns
+        ``False`` on timeout.
+        """
+        if self._pid != os.getpid():
+            return True
+        with self._cond:
+            return self._cond.wait_for(lambda: not (self._pending or self._busy) or self._error is not None, timeout)
+
+    def close(self) -> None:
+        """
+        Write the queue, stop the thread, and write synchronously from now
+        on.
+        """
+        self.drain()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        try:
+            self.stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending: # closed
+                    return
+            time.sleep(self.latency) # let the writes of a burst accumulate
+            with self._cond:
+                text = "".join(self._pending)
+                self._pending = []
+                self._pending_size = 0
+                self._busy = True
+                self._cond.notify_all() # the writers blocked by max_pending
+            try:
+                self.stream.write(self._coalesce(text))
+                self.stream.flush()
+            except (OSError, ValueError) as e: # e.g. BrokenPipeError, closed file
+                with self._cond:
+                    self._error = e
+                    self._busy = False
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _coalesce(self, text:str) -> str:
+        """
+        Drop the frames of each line that a later frame of the same line
+        redraws entirely.
+        """
+        if "\r" not in text:
+            return text
+        lines = text.split("\n")
+        for i, line in enumerate(lines):
+            last_frame = None
+            for last_frame in _FULL_FRAME_RE.finditer(line):
+                pass
+            if last_frame is None or last_frame.start() == 0:
+                continue
+            superseded = line[:last_frame.start()]
+            if "\r" in superseded and not _CURSOR_RE.search(superseded):
+                self.frames_dropped += superseded.count("\r")
+                lines[i] = line[last_frame.start():]
+        return "\n".join(lines)
+
+    # ----------------- #
+    # !-- TTY Logic --! #
+    # ----------------- #
+
+    def isatty(self) -> bool:
+        return self.stream.isatty()
+
+    @property
+    def encoding(self) -> str:
+        return self.stream.encoding
+
+    def fileno(self) -> int:
+        return self.stream.fileno()
+
+    # ------------------ #
+    # !-- Activation --! #
+    # ------------------ #
+
+    @staticmethod
+    def enable() -> None:
+        """
+        Write the output from a background thread, in this run and the
+        next ones (``config["async_output"]``).
+        """
+        config["async_output"] = True
+        OutputWriter._install()
+
+    @staticmethod
+    def disable() -> None:
+        """
+        Write the queue, and write synchronously again.
+        """
+        config["async_output"] = False
+        OutputWriter._uninstall()
+
+    @staticmethod
+    def enabled() -> bool:
+        return OutputWriter.active is not None
+
+    @staticmethod
+    def _install() -> None:
+        if OutputWriter.active is not None:
+            return
+        if OutputWriter._previous_hooks is None:
+            OutputWriter._previous_hooks = (sys.excepthook, threading.excepthook)
+            sys.excepthook = OutputWriter._excepthook
+            threading.excepthook = OutputWriter._threading_excepthook
+        with pStack.lock:
+            OutputWriter.active = OutputWriter(pStack.original_stdout)
+            pStack.original_stdout = OutputWriter.active
+
+    @staticmethod
+    def _uninstall() -> None:
+        writer = OutputWriter.active
+        if writer is None:
+            return
+        with pStack.lock:
+            OutputWriter.active = None
+            pStack.original_stdout = writer.stream
+        writer.close()
+
+    # --------------- #
+    # !-- Crashes --! #
+    # --------------- #
+
+    @staticmethod
+    def _drain_active() -> None:
+        writer = OutputWriter.active
+        if writer is not None:
+            writer.drain(timeout=5)
+
+    @staticmethod
+    def _excepthook(*args) -> None:
+        OutputWriter._drain_active() # the output must come before the traceback
+        OutputWriter._previous_hooks[0](*args)
+
+    @staticmethod
+    def _threading_excepthook(args) -> None:
+        OutputWriter._drain_active()
+        OutputWriter._previous_hooks[1](args)
+
+    @staticmethod
+    def _close_at_exit() -> None:
+        writer = OutputWriter.active
+        if writer is not None:
+            writer.close() # stays installed: what is printed later at exit is written synchronously
+
+
+atexit.register(OutputWriter._close_at_exit)
+
+if config["async_output"]:
+    OutputWriter._install()
+
+
+
+if __name__ == '__main__':
+
+    class SlowTerminal:
+        """
+        A terminal over a slow link: each write takes 5ms.
+        """
+
+        def __init__(self, stream):
+            self.stream = stream
+
+        def write(self, message):
+            time.sleep(0.005)
+            return self.stream.write(message)
+
+        def flush(self):
+            self.stream.flush()
+
+        def isatty(self):
+            return self.stream.isatty()
+
+        @property
+        def encoding(self):
+            return self.stream.encoding
+
+        def fileno(self):
+            return self.stream.fileno()
+
+    pStack.original_stdout = SlowTerminal(pStack.original_stdout)
+    for asynchronous in [False, True]:
+        if asynchronous:
+            OutputWriter._install()
+        start = time.perf_counter()
+        for i in range(301):
+            sum(range(10_000))
+            print(f"\r{i / 3:.1f}%", end="", flush=True) # a frame per iteration
+        print()
+        elapsed = time.perf_counter() - start
+        if asynchronous:
+            dropped = OutputWriter.active.frames_dropped
+            OutputWriter._uninstall()
+            print(f"with the writer thread: {elapsed:.2f}s, {dropped} frames dropped")
+        else:
+            print(f"synchronous: {elapsed:.2f}s")
+    pStack.original_stdout = pStack.original_stdout.stream
+
+    # the output comes before the traceback
+    OutputWriter._install()
+    print("Last words")
+    raise RuntimeError("Crash")
@@ -0,0 +1,218 @@
+import os
+import time
+import atexit
+import asyncio
+import operator
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import as_completed as _as_completed
+from typing import Literal
+
+from .progress_bar import ProgressBar
+from .mutable_class import MutableClass
+
+
+# ----------------- #
+# !-- Executors --! #
+# ----------------- #
+
+_executors = {} # (backend, workers) -> executor, reused across calls
+
+
+def get_executor(backend:Literal["thread", "process"], workers:int):
+    """
+    Return the persistent executor for ``backend`` with ``workers`` workers,
+    creating it on first use. Executors are shut down at interpreter exit.
+    """
+    assert backend in ["thread", "process"], f"Invalid backend '{backend}'. Choose among 'thread', 'process'."
+    key = (backend, workers)
+    if key not in _executors:
+        executor_class = ThreadPoolExecutor if backend == "thread" else ProcessPoolExecutor
+        _executors[key] = executor_class(max_workers=workers)
+    return _executors[key]
+
+
+def shutdown() -> None:
+    """
+    Shut down all the persistent executors.
+    """
+    while _executors:
+        _, executor = _executors.popitem()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown)
+
+
+# ------------------------ #
+# !-- Chunksize tuning --! #
+# ------------------------ #
+
+def _run_chunk(fn, chunk:list) -> tuple:
+    """
+    Worker side: apply ``fn`` to each item of the chunk, and measure how
+    long it took (without the IPC).
+    """
+    start = time.perf_counter()
+    results = [fn(item) for item in chunk]
+    return results, time.perf_counter() - start
+
+
+class ChunkTuner:
+    """
+    Pick chunk sizes for a process pool from the measured per-item latency.
+
+    The first chunks contain a single item and serve as probes. Afterwards,
+    chunks are sized so that each one runs for about ``target`` seconds,
+    which keeps the IPC overhead small for cheap functions, but never so
+    large that there are less than ``balance`` chunks per worker left
+    (otherwise a few workers would end up doing all the remaining work).
+
+    Parameters
+    ----------
+    workers : int
+        Number of worker processes.
+    size : int, optional
+        Total number of items, if known.
+    target : float, optional
+        Desired duration of a chunk, in seconds. Default is 0.05.
+    balance : int, optional
+        Minimal number of remaining chunks per worker. Default is 4.
+    """
+
+    def __init__(self, workers:int, size:int = None, target:float = 0.05, balance:int = 4) -> None:
+        self.workers = workers
+        self.size = size
+        self.target = target
+        self.balance = balance
+        self.latency = None # seconds per item (exponential average)
+        self.submitted = 0
+
+    def chunksize(self) -> int:
+        if self.latency is None:
+            n = 1
+        else:
+            n = self.target / max(self.latency, 1e-9)
+            if self.size is not None:
+                n = min(n, (self.size - self.submitted) / (self.balance * self.workers))
+        n = max(1, int(n))
+        self.submitted += n
+        return n
+
+    def record(self, n_items:int, duration:float) -> None:
+        per_item = duration / n_items
+        self.latency = per_item if self.latency is None else 0.7 * self.latency + 0.3 * per_item
+
+
+# --------------- #
+# !-- Helpers --! #
+# --------------- #
+
+def imap(fn, iterable, workers:int = None, backend:Literal["thread", "process"] = "thread", ordered:bool = True, size:int = None):
+    """
+    Lazily apply ``fn`` to the items of ``iterable`` on a pool, with a
+    progress bar. See :meth:`ProgressBar.imap`.
+    """
+    workers = workers or os.cpu_count() or 1
+    if size is None:
+        if hasattr(iterable, "__len__"):
+            size = len(iterable)
+        else:
+            hint = operator.length_hint(iterable, -1)
+            size = hint if hint > 0 else None
+
+    executor = get_executor(backend, workers)
+    if backend == "thread":
+        fn = MutableClass.propagate(fn) # the worker's messages are indented like the caller's
+    tuner = ChunkTuner(workers, size) if backend == "process" else None
+    items = iter(iterable) # consumed lazily, never buffered
+    max_in_flight = 2 * workers
+
+    pb = ProgressBar(size=size)
+    in_flight = {} # future -> index of the chunk
+    finished = {} # index -> results, for chunks completed out of order
+    n_submitted = 0
+    n_yielded = 0
+    exhausted = False
+    try:
+        while True:
+            # 1. Keep the pool busy
+            while not exhausted and len(in_flight) < max_in_flight:
+                chunk = list(islice(items, tuner.chunksize() if tuner else 1))
+                if not chunk:
+                    exhausted = True
+                    break
+                in_flight[executor.submit(_run_chunk, fn, chunk)] = n_submitted
+                n_submitted += 1
+
+            if not in_flight:
+                break
+
+            # 2. Collect what is done
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                results, duration = future.result() # re-raises the worker's exception
+                if tuner:
+                    tuner.record(len(results), duration)
+                pb.update(len(results))
+                if ordered:
+                    finished[index] = results
+                else:
+                    yield from results
+
+            # 3. Yield, in order, what can be yielded
+            while n_yielded in finished:
+                yield from finished.pop(n_yielded)
+                n_yielded += 1
+    finally:
+        for future in in_flight:
+            future.cancel()
+        pb.close()
+
+
+def as_completed(futures, size:int = None):
+    """
+    Yield ``futures`` as they complete, with a progress bar. See
+    :meth:`ProgressBar.as_completed`.
+    """
+    futures = set(futures)
+    pb = ProgressBar(size=size or len(futures))
+    try:
+        for future in _as_completed(futures):
+            pb.update()
+            yield future
+    finally:
+        pb.close()
+
+
+def as_completed_async(awaitables, size:int = None):
+    """
+    Asyncio counterpart of :func:`as_completed`: yield awaitables in
+    completion order, like ``asyncio.as_completed``, with a progress bar.
+    The bar is drawn by its renderer thread, and closed from a worker
+    thread, so the event loop never blocks on stdout. An awaitable that
+    raises counts as done; if the loop is left early, the bar is closed.
+    """
+    awaitables = list(awaitables)
+    pb = ProgressBar(size=size or len(awaitables))
+    remaining = len(awaitables)
+
+    async def counted(next_done):
+        nonlocal remaining
+        try:
+            return await next_done
+        finally: # an awaitable that failed is done too
+            pb.update()
+            remaining -= 1
+            if remaining == 0:
+                await asyncio.to_thread(pb.close)
+
+    if remaining == 0:
+        pb.close()
+    try:
+        for next_done in asyncio.as_completed(awaitables):
+            yield counted(next_done)
+    except BaseException: # GeneratorExit: the loop was left early (`break`, or an exception it did not catch)
+        pb.close() # idempotent, and stops the renderer thread
+        raise
@@ -1,6 +1,8 @@
 
 
 import sys
+import threading
+import contextvars
 
 
 class Spirit:
@@ -56,11 +58,20 @@ class PrintListener(Base):
     The PrintListener collects the spirits that are pushed onto it, and prints them in chronological order.
     Each time the standard `print` function is called, the messages of the spirits are printed first, and 
     the spirits are killed.
+
+    While :attr:`capture` holds another PrintListener (see :meth:`capturing`), everything written in the
+    current thread or asyncio task, spirits included, goes to that one instead (e.g. to group the output
+    of tasks running in parallel).
     """
     
+    capture = contextvars.ContextVar("oakley_capture", default=None) # PrintListener receiving the output, if any
+    
     def __init__(self, original_stdout):
         self.original_stdout = original_stdout
         self.secret_commonwealth:list[Spirit] = [] # we put spirits inside
+        self.lock = threading.RLock() # background renderers (see ProgressBar) print from other threads
+        self.region = None # active LiveRegion, erased before and redrawn after each write
+        self.at_line_start = True # whether the last character written was a newline
         
         # copy all the attributes of the original stdout to pStack, in case it has any special behavior
         for k, v in original_stdout.__dict__.items():
@@ -71,16 +82,35 @@ class PrintListener(Base):
         """
         Simply prints the message as 'print' would have done, but first displays anything that the Spirits have to say.
         """
-        # display anything that is in the stack first
-        while not self.empty():
-            msg = self.pop()
-            self.original_stdout.write(msg)
+        target = self.capture.get()
+        if target is not None and target is not self:
+            return target.write(message)
+        with self.lock:
+            region = self.region
+            something_to_write = bool(message) or not self.empty()
+            if region is not None and something_to_write:
+                region.erase() # the text must appear above the live region
+            
+            # display anything that is in the stack first
+            while not self.empty():
+                msg = self.pop()
+                self._write(msg)
+            self._write(message)
+            
+            if region is not None and something_to_write:
+                region.draw()
+    
+    def _write(self, message:str) -> None:
         self.original_stdout.write(message)
+        if message:
+            self.at_line_start = message.endswith("\n")
     
     def flush(self):
         """
         Just some necessary boilerplate for sys.stdout replacement.
         """
+        if self.capturing():
+            return
         self.original_stdout.flush()
         
     
@@ -93,7 +123,11 @@ class PrintListener(Base):
         Push a spirit onto the PrintListener's stack.
         """
         assert isinstance(spirit, Spirit), "Can only push Spirit instances onto the PrintStack."
-        self.secret_commonwealth.append(spirit)
+        target = self.capture.get()
+        if target is not None and target is not self:
+            return target.push(spirit)
+        with self.lock:
+            self.secret_commonwealth.append(spirit)
     
     def pop(self) -> str:
         """
@@ -108,11 +142,24 @@ class PrintListener(Base):
         """
         return len(self.secret_commonwealth) == 0
     
+    # --------------- #
+    # !-- Capture --! #
+    # --------------- #
+    
+    def capturing(self) -> bool:
+        """
+        Whether the output of the current thread or asyncio task is captured.
+        """
+        target = self.capture.get()
+        return target is not None and target is not self
+    
     # ----------------- #
     # !-- TTY Logic --! #
     # ----------------- #
     
     def isatty(self):
+        if self.capturing():
+            return False
         return self.original_stdout.isatty()
 
     @property
@@ -1,13 +1,27 @@
 
 from .fancy_string import cstr
 from .mutable_class import MutableClass
+import os
 import time
+import threading
+import operator
+import asyncio
+from concurrent.futures import Future as ConcurrentFuture
 from .task import Task
 from .message import Message
 from .status import MemoryView, TODO # TODO: create an function 'mute_all' to mute all children of MutableClass
 from .config import config
 from typing import Literal
-from .print_stack import in_notebook
+from .print_stack import in_notebook, pStack
+from .live_region import LiveRegion
+from .estimator import Estimator
+from .striped_counter import StripedCounter
+from .shared_counter import SharedCounter
+from .terminal import Terminal
+from .history import History
+from .latency import LatencyHistogram
+from .watchdog import Watchdog
+from .trace import Trace
 
 
 class ProgressBar(MutableClass):
@@ -29,20 +43,77 @@ class ProgressBar(MutableClass):
 
     Parameters
     ----------
-    lst : iterable
-        The iterable or iterator over which to loop.
+    lst : iterable or async iterable, optional
+        The iterable or iterator over which to loop. If ``None``, the bar is
+        advanced manually with :meth:`update` and closed with :meth:`close`.
+        Async iterables are supported with ``async for``.
     size : int, optional
         Length of the iterable. Only required when ``lst`` does not
         implement ``__len__`` (e.g., when it is a generator). If omitted,
-        the progress bar will attempt to convert the iterable to a list.
+        ``operator.length_hint`` is tried, and if no hint is available the
+        bar runs in open-ended mode (spinner, count, rate and elapsed time).
+        The iterable is never converted to a list.
+    threaded : bool, optional
+        If ``True``, the bar is drawn by a background daemon thread that
+        samples the progress at the refresh interval (see Notes). The
+        loop itself then only increments a counter, which is useful for
+        very tight loops over cheap items. Default is ``False``.
+    estimator : {'window', 'ewma', 'global'} or Estimator, optional
+        Model used to estimate the throughput and the remaining time (see
+        :mod:`oakley.estimator`). Default is ``'window'``.
+    unit : str, optional
+        Name of the unit being counted (``'it'``, ``'rows'``, ``'tokens'``,
+        ...). ``'B'`` displays amounts and rates with binary prefixes
+        (KB, MB/s, ...). Default is ``'it'``.
+    shared : bool or int, optional
+        Only for manual bars. If set, the progress is counted in shared
+        memory (see :class:`oakley.shared_counter.SharedCounter`), so that
+        child processes can advance the bar through ``pb.counter.add(n)``.
+        An integer gives the maximal number of worker processes (each one
+        needs its own cell of the counter). The per-worker breakdown is
+        printed when the bar is closed.
+        Default is ``False``.
+    name : str, optional
+        Name of the loop in the run history (see :class:`oakley.History`).
+        When the history is enabled, a named bar starts with the throughput
+        of its previous runs as ETA prior, and warns when it completes
+        slower than usual. Default is ``None`` (not recorded).
+    latency : bool or int, optional
+        Record the latency of each iteration (about 0.3µs per item) in a
+        log-bucketed histogram, and keep the slowest items. The statistics
+        are given by :meth:`stats`, and summarized when the loop ends
+        (p50/p90/p99, share of the time spent in the slowest 1% of the
+        items, slowest items). An integer sets the number of slowest items
+        kept (default 5). Only for iterables. Default is ``False``.
+    watchdog : float, optional
+        If set, a watchdog thread prints the stack of the thread running
+        the loop (through :meth:`whisper`) when the count has not changed for
+        this many seconds, and again with exponential backoff while the
+        loop stays stuck (see :class:`oakley.watchdog.Watchdog`). It costs
+        nothing while the loop progresses. Default is ``None``.
 
     Notes
     -----
     - The progress bar prints at most every 0.05 seconds to avoid excessive
-      terminal updates.
+      terminal updates. The bar measures how long it takes to draw itself,
+      and lowers its refresh rate so that drawing takes less than
+      ``config["overhead_budget"]`` of the loop time (1% by default). The
+      achieved fraction is given by :meth:`overhead`.
+    - Times are measured with the monotonic ``time.perf_counter_ns`` clock.
+      Once enough samples are collected, the remaining time is displayed
+      with a confidence band, e.g. ``00:04:00 ± 30s``.
     - Printing occurs on a single line using carriage returns (``'\\r'``).
     - A `Spirit` is always active during iteration to prevent unrelated
       printing from corrupting the progress bar display.
+    - When the output is not a terminal (log files, pipes, batch jobs...),
+      the bar is not redrawn in place. Instead, it prints a plain status
+      line, without colors, every ``config["log_interval"]`` seconds (and
+      every ``config["log_percent"]`` percent after the first interval),
+      and a summary line once done: a short loop only prints its summary.
+      See :meth:`set_mode` to force either behavior.
+    - Inside a :class:`LiveRegion`, the bar gets its own line in the region
+      (and is always drawn by the region's thread), so that several bars
+      can be displayed at once.
 
     Examples
     --------
@@ -56,25 +127,75 @@ class ProgressBar(MutableClass):
     >>> for i in ProgressBar(range(100)):
     ...     if i == 50:
     ...         ProgressBar.whisper("Halfway there!")
+
+    Rendering from a background thread:
+
+    >>> for i in ProgressBar(range(10_000_000), threaded=True):
+    ...     pass
+
+    Advancing manually, possibly from several threads:
+
+    >>> with ProgressBar(size=total_bytes, unit="B") as pb:
+    ...     for chunk in stream:
+    ...         pb.update(len(chunk))
+
+    Inside a coroutine (the bar is drawn by a background thread, so the
+    event loop never blocks on the terminal):
+
+    >>> async for page in ProgressBar(crawl(urls), size=len(urls)):
+    ...     await store(page)
+
+    Advancing from worker processes:
+
+    >>> with ProgressBar(size=len(files), shared=True) as pb:
+    ...     with ProcessPoolExecutor() as pool:
+    ...         pool.map(process_file, files, [pb.counter] * len(files)) # calls counter.add()
     """
     
     
     current_instance = None
+    default_spinner = ['|', '/', '-', '\\'] # used in open-ended mode when config["spinner"] is empty
+    render_interval = 0.05 # minimal number of seconds between two frames
+    incremental = True # on terminals, only rewrite the part of the line that changed
+    
+    # A line is a list of pieces (text, visible width, plain), "plain" meaning without ANSI codes.
+    # Colored pieces are built once and cached, so that drawing a frame never needs a regex.
+    _colored_pieces = {} # (text, color) -> piece
+    _bar_pieces = {} # bar width -> [piece for each number of completed glyphs]
 
     
-    def __init__(self, lst, size:int=None) -> None:
+    def __init__(self, lst=None, size:int=None, threaded:bool=False, estimator:'str|Estimator'="window", unit:str="it", shared:'bool|int'=False, name:str=None, latency:'bool|int'=False, watchdog:float=None) -> None:
         """
         Initialize a new progress bar over the given iterable.
 
         Parameters
         ----------
-        lst : iterable
+        lst : iterable or async iterable, optional
             The iterable or iterator object (e.g., list, range, enumerate,
-            zip, numpy array).
+            zip, numpy array, async generator). ``None`` for a bar advanced
+            with :meth:`update`.
         size : int, optional
             Length of the iterable. Required only if `lst` does not implement
-            ``__len__``. If omitted and length cannot be determined, the
-            iterable is converted to a list, which may be expensive.
+            ``__len__``. If omitted and length cannot be determined, not even
+            through ``operator.length_hint``, the bar is open-ended.
+        threaded : bool, optional
+            Draw the bar from a background thread instead of from the loop.
+            Default is ``False``.
+        estimator : {'window', 'ewma', 'global'} or Estimator, optional
+            Throughput model used for the rate and the remaining time.
+            Default is ``'window'``.
+        unit : str, optional
+            Unit being counted. Default is ``'it'``.
+        shared : bool or int, optional
+            Count the progress of a manual bar in shared memory, so that
+            worker processes can advance it. Default is ``False``.
+        name : str, optional
+            Key of the bar in the run history. Default is ``None``.
+        latency : bool or int, optional
+            Record the latency of each iteration. Default is ``False``.
+        watchdog : float, optional
+            Seconds without progress before the stack of the loop is
+            printed. Default is ``None``.
 
         Raises
         ------
@@ -84,158 +205,670 @@ class ProgressBar(MutableClass):
         super().__init__()
         ProgressBar.current_instance = self
         
-        if size is None:
-            if not hasattr(lst,'__len__'):
-                ProgressBar.print(cstr("[!]").red(),"Warning: unable to iterate over the object of type {type(lst)}. This may be because it is an iterator without a __len__ magic method. In this case, you can provide an argument 'size'.")
-                ProgressBar.print(cstr("[!]").red(),"Trying to convert to list (which might be time and memory consuming)...")
-                lst = list(lst)
-                
-            self.max = len(lst)
+        self.size_is_hint = False # True if max is only an estimate from operator.length_hint
+        if lst is None:
+            self.max = size # manual mode, None means open-ended
+        elif size is None:
+            if hasattr(lst,'__len__'):
+                self.max = len(lst)
+            else:
+                # stream the iterable: never buffer it into a list
+                hint = operator.length_hint(lst, -1)
+                self.max = hint if hint > 0 else None # None means open-ended
+                self.size_is_hint = self.max is not None
         else:
             self.max = size
         
             
-        assert hasattr(lst,'__iter__'), "The object provided is not iterable."
-        self.list = lst.__iter__()
+        assert lst is None or hasattr(lst,'__iter__') or hasattr(lst,'__aiter__'), "The object provided is not iterable."
+        self.list = lst.__iter__() if hasattr(lst,'__iter__') else None
+        self.alist = lst if self.list is None and lst is not None else None # async-only iterable
+        
+        # per-iteration latency: the iterable is wrapped by a generator that times each item
+        assert not latency or lst is not None, "Latencies can only be recorded when iterating."
+        self.histogram = None
+        if latency:
+            self.histogram = LatencyHistogram(k=5 if latency is True else latency)
+            if self.list is not None:
+                self.list = self._timed(self.list)
+            else:
+                self.alist = self._atimed(self.alist)
         
+        self.unit = unit
         self.count = 0
-        self.start_time = time.time()
+        assert not shared or lst is None, "Only manual progress bars (without iterable) can be shared between processes."
+        if shared:
+            self.counter = SharedCounter(workers=None if shared is True else shared) # manual mode: add() from any process
+        elif lst is None:
+            self.counter = StripedCounter() # manual mode: update() from any thread
+        else:
+            self.counter = None
+        self.start_time = time.perf_counter()
         
         self.previous_print = ""
+        self.previous_pieces = [] # pieces of the line currently on screen, see _print_pb
+        self.previous_width = 0
         self.previous_print_time = -999 # we want to avoid printing too often!
+        self.refresh_interval = ProgressBar.render_interval # adapted to the cost of drawing, see _render
+        self.render_cost = 0.0 # exponential average of the duration of a frame, in seconds
+        self.render_time = 0.0 # total time spent drawing, in seconds
         self.spirit = self.create_spirit("") # always create default spirit
         
-        # keep track of the time of the last 10 steps
-        self.time_of_steps = []
+        # throughput model, fed with (time, count) pairs
+        self.estimator = Estimator.from_spec(estimator)
+        self.estimator.start(time.perf_counter_ns())
+        self.name = name
+        if name is not None and History.enabled():
+            past_rate = History.rate(name)
+            if past_rate is not None:
+                self.estimator.seed(*past_rate)
+        
+        # background rendering (by the live region if there is one)
+        self.region = LiveRegion.current()
+        self.threaded = threaded or self.region is not None
+        self._threaded_iterator = None
+        self._async_iterator = None
+        self._stop_render = threading.Event()
+        self._render_thread = None
+        
+        # log mode: periodic plain lines instead of in-place redraws
+        self.log_mode = not Terminal.interactive()
+        self.last_log_time = self.start_time
+        self.next_log_percent = config["log_percent"]
         
         # keep track of this for the spinners
         self.print_count = 0
         self.previous_spinner_time = -999
         
+        # timeline of the run, as a child of the running task
+        self.span = None
+        if Trace.enabled() and config["trace_bars"]:
+            task = Task.current()
+            self.span = Trace.begin(task.span[0] if task is not None and task.span is not None else None)
+        
+        # stall detection
+        self.watchdog = None
+        if watchdog is not None:
+            self.watchdog = Watchdog(self, ProgressBar._progress, watchdog, name or "Progress bar")
+        
+        # manual bars are always drawn by the renderer thread, so that update() stays cheap
+        self.closed = False
+        if self.counter is not None:
+            self.threaded = True
+            self._start_renderer()
+        
         
     # ------------------------- #
     # !-- Iterator Protocol --! #
     # ------------------------- #
         
     
-    def __iter__(self) -> 'ProgressBar':
-        return self
+    def __iter__(self):
+        assert self.list is not None, "This object can only be iterated with 'async for'."
+        # a fresh generator that only the for loop holds: if the loop is left
+        # with `break` or an exception, the generator is closed and the bar
+        # stops its renderer, its watchdog and its trace span
+        if self.threaded:
+            return self._iter_threaded()
+        return self._iter_plain()
     
     def __next__(self):
+        if self.threaded:
+            if self._threaded_iterator is None:
+                self._threaded_iterator = self._iter_threaded()
+            return next(self._threaded_iterator)
+        
         if self.max==0:
             raise StopIteration()
         
-        self.time_of_steps.append(time.time())
-        # keep only last 20 steps
-        if len(self.time_of_steps)>20:
-            self.time_of_steps.pop(0)
-        
         self.show()
-        self.count += 1 # update the progress
         
         try:
-            return next(self.list)
+            item = next(self.list)
         except StopIteration:
+            self._render_final()
+            self._finish()
+            raise(StopIteration())
+        
+        self.count += 1 # update the progress
+        return item
+    
+    def _iter_plain(self):
+        """
+        Generator used in non-threaded mode, doing the work of
+        :meth:`__next__`.
+        """
+        if self.max == 0:
+            return
+        
+        items = self.list
+        try:
+            while True:
+                self.show()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                self.count += 1 # update the progress
+                yield item
+        except BaseException: # includes GeneratorExit, when the loop is left with `break`
+            self._abandon()
+            raise
+        
+        self._render_final()
+        self._finish()
+    
+    def _abandon(self, join:bool = True) -> None:
+        """
+        The loop was left early (``break`` or an exception): stop the threads
+        of the bar and close its trace span, keeping its last frame.
+        """
+        if join:
+            self._stop_renderer()
+        else:
+            self._stop_render.set() # the generator may be closing in a coroutine: no waiting
+        self._stop_watchdog()
+        self._leave_region()
+        if self.span is not None:
+            Trace.end(self.span, self.name or "Progress bar", "bar", args={"count": self.count, "aborted": True})
+            self.span = None
+        if ProgressBar.current_instance is self:
+            ProgressBar.current_instance = None
+    
+    def _add_step(self, t_ns:int = None) -> None:
+        """
+        Feed the current (time, count) pair to the estimator. Only done
+        before drawing a frame: the estimator works on intervals of at least
+        its resolution, so a sample per item would add nothing.
+        """
+        self.estimator.update(t_ns or time.perf_counter_ns(), self.count)
+    
+    def _render_final(self) -> None:
+        """
+        If the size was unknown (or only a hint), the final state has not
+        been displayed yet: now we know the size, so draw it.
+        """
+        if self.count != self.max:
+            self.max = self.count
+            self._add_step()
+            self._render()
+    
+    def _check_hint(self) -> None:
+        """
+        If ``max`` came from ``operator.length_hint`` and the loop went past
+        it, the hint was wrong: switch to open-ended mode.
+        """
+        if self.size_is_hint and self.count > self.max:
+            self.max = None
+            self.size_is_hint = False
+    
+    def _finish(self) -> None:
+        """
+        Close the progress bar once the iterable is exhausted.
+        """
+        self._stop_watchdog()
+        if self.span is not None:
+            Trace.end(self.span, self.name or "Progress bar", "bar", args={"count": self.count})
+        if self.region is not None:
+            self._leave_region()
+            ProgressBar.current_instance = None
+        else:
             self.spirit.kill() # remove the spirit from the print stack
             ProgressBar.current_instance = None # delete the progressbar, as the loop has ended
-            self.print(ignore_tabs=True) # go to next line
-            raise(StopIteration())
+            if self.log_mode:
+                self._log_summary()
+            else:
+                self.print(ignore_tabs=True) # go to next line
+        if self.histogram is not None and self.histogram.n > 0:
+            self._print_latency()
+        self._record_history()
+    
+    @staticmethod
+    def _progress(pb:'ProgressBar') -> int:
+        """
+        Progress signature watched by the watchdog.
+        """
+        return pb.counter.value() if pb.counter is not None else pb.count
+    
+    def _stop_watchdog(self) -> None:
+        if self.watchdog is not None:
+            self.watchdog.stop()
+    
+    def _record_history(self) -> None:
+        """
+        Store the run in the history (named bars only), and warn if it was
+        slower than usual.
+        """
+        if self.name is None or not History.enabled() or not self.count:
+            return
+        duration = time.perf_counter() - self.start_time
+        _, usual, regression = History.compare("bar", self.name, duration, self.count)
+        History.record("bar", self.name, duration, self.count)
+        if regression is not None:
+            Message(
+                f"{self.name} was {regression:.0%} slower than usual ({ProgressBar.time(duration)} vs. {ProgressBar.time(usual)})", "?"
+            )
+    
+    
+    # --------------- #
+    # !-- Latency --! #
+    # --------------- #
+    
+    def _timed(self, items):
+        """
+        Wrap an iterator to record the time between two consecutive items,
+        i.e. the time spent by the loop body (and fetching the item).
+        """
+        record = self.histogram.record
+        clock = time.perf_counter_ns
+        index = 0
+        start = clock()
+        for item in items:
+            yield item
+            now = clock()
+            record(now - start, index)
+            start = now
+            index += 1
+    
+    async def _atimed(self, items):
+        """
+        Async counterpart of :meth:`_timed`.
+        """
+        record = self.histogram.record
+        clock = time.perf_counter_ns
+        index = 0
+        start = clock()
+        async for item in items:
+            yield item
+            now = clock()
+            record(now - start, index)
+            start = now
+            index += 1
+    
+    def stats(self) -> dict:
+        """
+        Latency statistics of the iterations, in seconds (requires
+        ``latency=True``).
+
+        Returns
+        -------
+        dict
+            ``count``, ``mean``, ``p50``, ``p90``, ``p99``, ``max``,
+            ``tail_share`` (share of the total time spent in the slowest 1%
+            of the items) and ``slowest``, a list of ``(index, seconds)``
+            pairs, slowest first.
+
+        Examples
+        --------
+        >>> pb = ProgressBar(files, latency=True)
+        >>> for f in pb:
+        ...     process(f)
+        >>> pb.stats()["p99"]
+        0.0213
+        """
+        assert self.histogram is not None, "Latencies are not recorded, use ProgressBar(..., latency=True)."
+        return self.histogram.summary()
+    
+    def _print_latency(self) -> None:
+        """
+        Print the latency summary below the final line of the bar.
+        """
+        stats = self.stats()
+        t = ProgressBar.precise_time
+        prefix = "[l]" if self.log_mode else cstr("[l]").cyan()
+        slowest = ", ".join(f"#{index} ({t(seconds)})" for index, seconds in stats["slowest"])
+        with ProgressBar.tab():
+            ProgressBar.print(
+                prefix, f"latency p50 {t(stats['p50'])}, p90 {t(stats['p90'])}, p99 {t(stats['p99'])}, max {t(stats['max'])}"
+            )
+            if stats["count"] >= 100:
+                ProgressBar.print(prefix, f"the slowest 1% of the items took {stats['tail_share']:.0%} of the time")
+            if slowest:
+                ProgressBar.print(prefix, f"slowest: {slowest}")
+    
+    
+    # ------------------------------- #
+    # !-- Async Iterator Protocol --! #
+    # ------------------------------- #
+    
+    def __aiter__(self):
+        # like in threaded mode, a fresh generator so that the renderer stops if the loop is left early
+        return self._iter_async()
+    
+    async def __anext__(self):
+        if self._async_iterator is None:
+            self._async_iterator = self._iter_async()
+        return await self._async_iterator.__anext__()
+    
+    async def _iter_async(self):
+        """
+        Async generator behind ``async for``. Drawing always happens in the
+        renderer thread, and the last frame is offloaded with
+        ``asyncio.to_thread``: no coroutine ever waits on stdout.
+        """
+        if self.max == 0:
+            return
+        
+        self.threaded = True
+        self._start_renderer() # only starts the thread, which draws the first frame
+        try:
+            if self.alist is not None:
+                async for item in self.alist:
+                    yield item
+                    self.count += 1
+            else:
+                for item in self.list:
+                    yield item
+                    self.count += 1
+        except BaseException:
+            self._abandon(join=False) # no await here: the generator may be closing
+            raise
+        
+        await asyncio.to_thread(self._end_threaded)
+    
+    
+    # ----------------------- #
+    # !-- Manual Progress --! #
+    # ----------------------- #
+    
+    def update(self, n:int = 1) -> None:
+        """
+        Advance a manual progress bar by ``n`` units.
+
+        Safe to call from several threads at the same time: each thread
+        increments its own counter, and the renderer thread adds them up.
+
+        Parameters
+        ----------
+        n : int, optional
+            Amount of progress made (items, bytes, rows...). Default is 1.
+
+        Examples
+        --------
+        >>> pb = ProgressBar(size=1000, unit="rows")
+        >>> for chunk in chunks:
+        ...     pb.update(len(chunk))
+        >>> pb.close()
+        """
+        assert self.counter is not None, "update() is only available for manual progress bars, created with ProgressBar(size=...)."
+        self.counter.add(n)
+    
+    def close(self) -> None:
+        """
+        Stop a manual progress bar and draw its final state.
+        """
+        if self.closed or self.counter is None:
+            return
+        self.closed = True
+        self._stop_renderer()
+        self.count = self.counter.value()
+        if self.max is None:
+            self.max = self.count # an open-ended bar is complete once closed
+        self._add_step()
+        self._render()
+        self._finish()
+        
+        if isinstance(self.counter, SharedCounter):
+            self.counter.unlink()
+            self._print_workers()
+    
+    def _print_workers(self) -> None:
+        """
+        Print how much each process contributed to a shared progress bar.
+        """
+        values = self.counter.values()
+        total = sum(values) or 1
+        prefix = "[w]" if self.log_mode else cstr("[w]").cyan()
+        with ProgressBar.tab():
+            for i, value in enumerate(values):
+                if value == 0:
+                    continue
+                name = "main process" if i == 0 else f"worker {i}"
+                ProgressBar.print(
+                    prefix, f"{name}: {self._amount(value, with_unit=True)} ({value/total:.0%})"
+                )
+    
+    def __enter__(self) -> 'ProgressBar':
+        super(MutableClass, self).__enter__() # the bar stays on its line: no indentation
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+        super(MutableClass, self).__exit__(*args)
+    
+    
+    # ---------------------------- #
+    # !-- Background Rendering --! #
+    # ---------------------------- #
+    
+    def _iter_threaded(self):
+        """
+        Generator used in threaded mode. The only per-item work is a
+        counter increment; drawing is done by :meth:`_render_loop`.
+        """
+        if self.max == 0:
+            return
+        
+        self._start_renderer()
+        try:
+            for item in self.list:
+                yield item
+                self.count += 1
+        except BaseException: # includes GeneratorExit, when the loop is left with `break`
+            self._abandon()
+            raise
+        
+        self._end_threaded()
+    
+    def _end_threaded(self) -> None:
+        """
+        The loop ended normally: stop the renderer and draw the final state.
+        """
+        self._stop_renderer()
+        if self.count != self.max:
+            self.max = self.count # the size was unknown or only a hint
+        self._add_step()
+        self._render()
+        self._finish()
+    
+    def _start_renderer(self) -> None:
+        self._add_step()
+        if self.region is not None:
+            self.region.add(self) # the region's thread draws us
+            return
+        self._stop_render.clear()
+        self._render_thread = threading.Thread(target=ProgressBar.propagate(self._render_loop), name="oakley-progressbar", daemon=True)
+        self._render_thread.start()
+    
+    def _stop_renderer(self) -> None:
+        self._stop_render.set()
+        if self._render_thread is not None and self._render_thread is not threading.current_thread():
+            self._render_thread.join()
+        self._render_thread = None
+    
+    def _render_loop(self) -> None:
+        """
+        Body of the renderer thread: sample ``count`` at a fixed frame rate
+        and redraw the bar whenever it changed.
+        """
+        self._render() # first frame right away
+        last_count = self.count
+        while not self._stop_render.wait(self.refresh_interval):
+            if ProgressBar.current_instance is not self:
+                return # another bar took over
+            if self.counter is not None:
+                self.count = self.counter.value()
+            count = self.count
+            if count == last_count:
+                continue # nothing new, and we don't want to reprint over someone else's line
+            last_count = count
+            self._add_step()
+            self._render()
+        
+    
+    # ------------------- #
+    # !-- Live Region --! #
+    # ------------------- #
+    
+    def _live_line(self) -> str:
+        """
+        Called by the live region's thread at each frame.
+        """
+        if self.counter is not None:
+            self.count = self.counter.value()
+        self._add_step()
         
+        # update the spinner at most 10 times per second
+        current_time = time.perf_counter()
+        if current_time - self.previous_spinner_time > 0.1:
+            self.previous_spinner_time = current_time
+            self.print_count += 1
+        return self._line()
+    
+    def _leave_region(self) -> None:
+        """
+        Remove the bar from the live region and print its last state above it.
+        """
+        if self.region is None or not self.region.hosts(self):
+            return
+        with pStack.lock:
+            self.region.remove(self)
+            self._add_step()
+            self.print(self._line())
+    
     
     # -------------- #
     # !-- Header --! #
     # -------------- #
     
-    def _get_header(self, terminal_width:int) -> str:
+    @staticmethod
+    def _colored(text:str, color:str) -> tuple:
+        """
+        Return the (cached) piece for ``text`` in ``color``.
+        """
+        key = (text, color)
+        piece = ProgressBar._colored_pieces.get(key)
+        if piece is None:
+            piece = ProgressBar._colored_pieces[key] = (getattr(cstr(text), color)(), len(text), False)
+        return piece
+    
+    @staticmethod
+    def _bar_templates(bar_width:int) -> list:
+        """
+        Return the bar pieces of width ``bar_width`` for every fill level,
+        built on first use.
+        """
+        pieces = ProgressBar._bar_pieces.get(bar_width)
+        if pieces is None:
+            bar_car = "━"
+            pieces = []
+            for n_bars_completed in range(bar_width + 1):
+                n_bars_remaining = bar_width - n_bars_completed
+                sep_char = "" if n_bars_completed == 0 or n_bars_remaining == 0 else " "
+                text = " " + cstr(bar_car*n_bars_completed).green() + sep_char + cstr(bar_car*n_bars_remaining).red()
+                pieces.append((text, 1 + bar_width + len(sep_char), False))
+            ProgressBar._bar_pieces[bar_width] = pieces
+        return pieces
+    
+    def _get_header(self, terminal_width:int) -> tuple:
         """
         Returns the header part of the progress bar, which can be either
         a percentage or a spinner if the max is unknown.
         """
+        if self.max is None:
+            # open-ended: always spin, with the default spinner if none is configured
+            spinner = config["spinner"] or ProgressBar.default_spinner
+            return ProgressBar._colored(f"[{spinner[self.print_count % len(spinner)]}]", "red")
+        
         if len(config["spinner"]) == 0 or self.count == self.max:
             progress_percent = f"{(int(self.count/self.max*100)):02d}%" if self.max>0 and self.count < self.max else "%"
-            header = cstr(f"[{progress_percent}]")
+            header = f"[{progress_percent}]"
         else:
-            header = cstr(f"[{config['spinner'][self.print_count % len(config['spinner'])]}]")
-        return header.red() if self.count < self.max else header.green()
+            header = f"[{config['spinner'][self.print_count % len(config['spinner'])]}]"
+        return ProgressBar._colored(header, "red" if self.count < self.max else "green")
     
-    def _get_bar(self, terminal_width:int) -> str:
+    def _get_bar(self, terminal_width:int) -> tuple|None:
         
-        if self.count == self.max:
-            return ""
+        if self.count == self.max or self.max is None:
+            return None
         
-        # we assume that header + stats take 50 characters at most
-        bar_width = terminal_width - 50
+        # we assume that header + stats take 58 characters at most (50 without the ± band)
+        bar_width = terminal_width - 58
         
         if bar_width < 5:
-            return ""
+            return None
         
         bar_width = min(25, bar_width)
-        bar_car = "━"
-        n_bars_completed = int(bar_width * self.count / self.max)
-        n_bars_remaining = bar_width - n_bars_completed
-        if n_bars_completed == 0 or n_bars_remaining == 0:
-            sep_char = ""
-        else:
-            sep_char = " "
-            if n_bars_completed == 0:
-                n_bars_remaining += 1
-            if n_bars_remaining == 0:
-                n_bars_completed += 1
-            
-        bar = cstr(bar_car*n_bars_completed).green() + sep_char + cstr(bar_car*n_bars_remaining).red()
-        return bar
+        n_bars_completed = min(bar_width, int(bar_width * self.count / self.max))
+        return ProgressBar._bar_templates(bar_width)[n_bars_completed]
     
     def _get_stats(self, terminal_width:int) -> str:
         
-        # 1. Compute elapsed time
-        if self.time_of_steps == []:
-            elapsed_time = time.time() - self.start_time # should not happen if you do for i in ProgressBar(...) because next is called right away.
-        else:
-            elapsed_time = self.time_of_steps[-1] - self.start_time # self.time_of_steps can never be empty here
-        
+        # 1. Compute elapsed time (time of the last step)
+        elapsed_time = self.estimator.elapsed
         elapsed_time_str = ProgressBar.time(elapsed_time)
         
-        # 2. Compute the average it/s (as average over last steps)
-        if self.count == 0:
-            it_per_s = "?"
+        # 2. Get the it/s from the estimator
+        it_per_s = self.estimator.rate() if self.count > 0 else None
+        if it_per_s is None:
+            it_per_time_str = f"? {self.unit}/s"
         else:
-            n_steps = len(self.time_of_steps)-1
-            delta_time = self.time_of_steps[-1] - self.time_of_steps[0]
-            it_per_s = it_per_time = n_steps/delta_time
+            it_per_time = it_per_s
             
             # choose units
-            it_per_time_unit = "it/s"
+            it_per_time_unit = "s"
             if it_per_time < 2:
                 it_per_time = it_per_time * 60 # it per minute
-                it_per_time_unit = "it/min"
+                it_per_time_unit = "min"
             if it_per_time < 2:
                 it_per_time = it_per_time * 60 # it per hour
-                it_per_time_unit = "it/h"
-            it_per_time_str = ProgressBar.number(it_per_time) + f" {it_per_time_unit}"
+                it_per_time_unit = "h"
+            it_per_time_str = self._amount(it_per_time, with_unit=True) + f"/{it_per_time_unit}"
         
-        # 3. Compute remaining time
-        if self.count==0 or self.max==0:
+        # 3. Compute remaining time, with its confidence band
+        eta = self.estimator.eta(self.max - self.count) if it_per_s is not None and self.max else None
+        spread_str = ""
+        if eta is None or eta[0] == float("inf"):
             remaining_time_str = "?"
         else:
-            n_steps_remaining = self.max - self.count
-            remaining_time_sec = n_steps_remaining / it_per_s
+            remaining_time_sec, spread = eta
             remaining_time_str = ProgressBar.time(remaining_time_sec)
+            if spread is not None and self.count < self.max:
+                spread_str = f" ± {ProgressBar.short_time(spread)}"
         
         # 4. Get progress count/max
-        progress_count_str = f"{ProgressBar.number(self.count)}/{ProgressBar.number(self.max)}" if self.max>0 else "?"
+        progress_count_str = f"{self._amount(self.count)}/{self._amount(self.max)}" if self.max else "?"
         
         # 5. Combine all stats
         if self.count == 0:
             return ""
         
+        if self.max is None:
+            # open-ended: no remaining time, only what we know
+            count_str = self._amount(self.count, with_unit=True)
+            if terminal_width < 40:
+                return f"[{elapsed_time_str}, {count_str}]"
+            return f"[{elapsed_time_str}, {it_per_time_str}, {count_str}]"
+        
         if terminal_width < 40:
             return f"[{elapsed_time_str} > {remaining_time_str}]" # len = 23 (including header)
         if terminal_width < 50:
             return f"[{elapsed_time_str} > {remaining_time_str}, {it_per_time_str}]" # len = 34 (including header)
-        return f"[{elapsed_time_str} > {remaining_time_str}, {it_per_time_str}, {progress_count_str}]" # len = 42 (including header)
+        return f"[{elapsed_time_str} > {remaining_time_str}{spread_str}, {it_per_time_str}, {progress_count_str}]" # len = 50 (including header)
         
     
     
+    def _amount(self, value:float, with_unit:bool = False) -> str:
+        """
+        Format an amount of ``self.unit`` (bytes get binary prefixes).
+        """
+        if self.unit == "B":
+            return ProgressBar.bytes(value)
+        if with_unit:
+            return f"{ProgressBar.number(value)} {self.unit}"
+        return ProgressBar.number(value)
+    
+    
     # ---------------------------- #
     # !-- Progress Bar Display --! #
     # ---------------------------- #
@@ -257,51 +890,187 @@ class ProgressBar(MutableClass):
         
         # 1. Check if we should print something
         
-        current_time = time.time()
-        # if we have printed something less than 0.05s ago, we skip this print
+        current_time = time.perf_counter_ns() # the clock of time.perf_counter, in ns
+        # if we have printed something less than refresh_interval ago, we skip this print
         # unless this is the very last print!
-        delta_time = current_time - self.previous_print_time
-        if delta_time < 0.05 and self.count < self.max:
+        delta_time = current_time * 1e-9 - self.previous_print_time
+        if delta_time < self.refresh_interval and self.count != self.max:
             return
-        if self.count == self.max:
-            time.sleep(0.05) # wait a bit to ensure the last print is after 0.05s from previous one
         
-        # 2. Prepare the next print
-        terminal_width = self._get_terminal_width() # between 30 and 75
-        
-        header = self._get_header(terminal_width)
-        bar = self._get_bar(terminal_width)
-        numbers = self._get_stats(terminal_width) # all separated by " "
+        self._add_step(current_time)
+        self._render()
+    
+    def _render(self) -> None:
+        """
+        Build and print the progress bar line, regardless of when the last
+        print happened. Called by :meth:`show` and by the background renderer.
+        """
+        if self.region is not None:
+            return # the live region draws the bar
+        if self.log_mode:
+            return self._log()
         
-        next_print = " ".join([item for item in [header, bar, numbers] if item])
-        self.previous_print_time = time.time()
+        start_time = time.perf_counter()
+        next_print = self._pieces()
         
         # we are printing comething with "\r", therefore we need a spirit so that someone else doesn't interrupt us
-        self.spirit.kill()  # remove the spirit from the print stack
-        self._print_pb(
-            next_print,
-            newline=False
+        with pStack.lock: # the renderer thread and the main thread must not interleave here
+            self._kill_spirit()
+            self._print_pb(
+                next_print,
+                newline=False
+            )
+            self.spirit = self.create_spirit("\n")
+        
+        self.previous_print_time = time.perf_counter()
+        self._adapt_refresh(self.previous_print_time - start_time)
+    
+    def _log(self) -> None:
+        """
+        Log mode: print a plain status line if ``config["log_interval"]``
+        seconds passed since the last one, or if a multiple of
+        ``config["log_percent"]`` percent was crossed and the loop has run
+        for at least ``config["log_interval"]`` seconds. The final state is
+        left to :meth:`_log_summary`.
+        """
+        self._check_hint()
+        if self.max is not None and self.count >= self.max:
+            return
+        now = time.perf_counter()
+        due = now - self.last_log_time >= config["log_interval"]
+        percent = None
+        if self.max and config["log_percent"] > 0:
+            percent = 100 * self.count / self.max
+            long_loop = now - self.start_time >= config["log_interval"] # a short loop only prints its summary
+            due = due or (long_loop and percent >= self.next_log_percent)
+        if not due or self.count == 0:
+            return
+        
+        self.last_log_time = now
+        if percent is not None:
+            step = config["log_percent"]
+            self.next_log_percent = (percent // step + 1) * step
+        header = f"[{int(percent):02d}%] " if percent is not None else ""
+        name = f"{self.name}: " if self.name is not None else ""
+        self.print(f"{header}{name}{self._get_stats(999)}")
+    
+    def _log_summary(self) -> None:
+        """
+        Log mode: print the final line of the bar.
+        """
+        elapsed = time.perf_counter() - self.start_time
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        name = f"{self.name}: " if self.name is not None else ""
+        self.print(
+            f"[%] {name}{self._amount(self.count, with_unit=True)} in {ProgressBar.time(elapsed)} "
+            f"({self._amount(rate, with_unit=True)}/s)"
         )
-        self.spirit = self.create_spirit("\n")
+    
+    def _adapt_refresh(self, frame_cost:float) -> None:
+        """
+        Keep the time spent drawing under the overhead budget: a frame that
+        costs ``c`` seconds is drawn at most every ``c / budget`` seconds.
+        """
+        self.render_time += frame_cost
+        self.render_cost = frame_cost if self.render_cost == 0 else 0.8 * self.render_cost + 0.2 * frame_cost
+        self.refresh_interval = max(ProgressBar.render_interval, self.render_cost / config["overhead_budget"])
+    
+    def overhead(self) -> float:
+        """
+        Fraction of the elapsed time spent drawing the progress bar.
+
+        Examples
+        --------
+        >>> pb = ProgressBar(range(1000))
+        >>> for i in pb:
+        ...     ...
+        >>> pb.overhead()
+        0.0021
+        """
+        elapsed = time.perf_counter() - self.start_time
+        return self.render_time / elapsed if elapsed > 0 else 0.0
             
     
-    def _print_pb(self, msg:str, newline:bool = True) -> None:
+    def _line(self) -> str:
+        """
+        Build the progress bar line for the current state.
+        """
+        return "".join(text for text, _, _ in self._pieces())
+    
+    def _pieces(self) -> list:
+        """
+        Build the progress bar line for the current state, as a list of
+        ``(text, visible width, plain)`` pieces.
+        """
+        self._check_hint()
+        
+        # 2. Prepare the next print
+        terminal_width = self._get_terminal_width() # between 30 and 75
+        
+        pieces = [self._get_header(terminal_width)]
+        bar = self._get_bar(terminal_width)
+        if bar is not None:
+            pieces.append(bar)
+        numbers = self._get_stats(terminal_width) # all separated by " "
+        if numbers:
+            pieces.append((" " + numbers, 1 + len(numbers), True))
+        return pieces
+    
+    def _kill_spirit(self) -> None:
+        """
+        Remove the spirit from the print stack before rewriting the line. If
+        it is already dead, something was printed after the bar (the spirit
+        ended its line): the next frame starts over on a new line.
+        """
+        if not self.spirit.is_alive():
+            self.previous_pieces = []
+            self.previous_width = 0
+        self.spirit.kill()
+    
+    def _print_pb(self, pieces:list, newline:bool = True) -> None:
         """
-        Prints if and only if the message is different from the previous one.
-        Prints enough white spaces to fill the line (and erase previous content).
+        Prints if and only if the line is different from the previous one.
+        
+        On terminals, only the part of the line that changed is rewritten,
+        followed by an erase-to-end-of-line code. Elsewhere, the whole line
+        is printed with enough white spaces to erase the previous content.
         
         If not newline, then the print ends with '\r' instead of '\n'.
         """
-        if msg != self.previous_print:
-            n_to_erase = cstr(self.previous_print).length()
-            n_to_erase = min(self._get_terminal_width(min_value=0, margin=5, _ignore_config=True), n_to_erase)
-            self.print("\r", end="", ignore_tabs=True) # go back to the beginning of the line
-            n_spaces = max(0, n_to_erase - cstr(msg).length())
-            self.print(msg + n_spaces*" ", end="\n" if newline else "") # go back to the beginning of the line and erase previous content
+        if pieces != self.previous_pieces:
+            line = "".join(text for text, _, _ in pieces)
+            width = sum(piece[1] for piece in pieces)
+            end = "\n" if newline else ""
+            if ProgressBar.incremental and not in_notebook and Terminal.isatty():
+                # skip the unchanged prefix: identical pieces first, then identical characters of a plain piece
+                column, i = 0, 0
+                previous = self.previous_pieces
+                while i < len(pieces) and i < len(previous) and pieces[i] == previous[i]:
+                    column += pieces[i][1]
+                    i += 1
+                suffix = "".join(text for text, _, _ in pieces[i:])
+                if i < len(pieces) and i < len(previous) and pieces[i][2] and previous[i][2]:
+                    n_common = len(os.path.commonprefix([pieces[i][0], previous[i][0]]))
+                    column += n_common
+                    suffix = suffix[n_common:]
+                if column == 0:
+                    self.print("\r", end="", ignore_tabs=True) # go back to the beginning of the line
+                    self.print(suffix + "\033[K", end=end)
+                else:
+                    indent = ProgressBar.indentation()
+                    column += indent + 2 if indent > 0 else 0
+                    self.print(f"\r\033[{column}C{suffix}\033[K", end=end, ignore_tabs=True) # jump over what did not change
+            else:
+                n_to_erase = min(self._get_terminal_width(min_value=0, margin=5, _ignore_config=True), self.previous_width)
+                self.print("\r", end="", ignore_tabs=True) # go back to the beginning of the line
+                n_spaces = max(0, n_to_erase - width)
+                self.print(line + n_spaces*" ", end=end) # erase previous content
             
             # 3. Update previous print
-            self.previous_print = msg
-            self.previous_print_time = time.time()
+            self.previous_print = line
+            self.previous_pieces = [] if newline else pieces # after a newline, we start on an empty line
+            self.previous_width = 0 if newline else width
+            self.previous_print_time = time.perf_counter()
             
             # 4. Check wether we wan't to update the spinner (at most 10 times per second)
             if self.previous_print_time - self.previous_spinner_time > 0.1:
@@ -313,19 +1082,100 @@ class ProgressBar(MutableClass):
         """
         Returns the current terminal width in number of characters.
         """
-        import shutil
-        terminal_size = shutil.get_terminal_size((999, 20)).columns
-        
-        # account for provided terminal_size in config
-        if config["terminal_width"] > 0 and not _ignore_config:
-            terminal_size = min(terminal_size, config["terminal_width"]) # if terminal size lower than provided, keep the low one
+        terminal_size = Terminal.width(ignore_config=_ignore_config) # cached, refreshed when the terminal is resized
         
-        n_tab_chars = ProgressBar.indent + 2 if ProgressBar.indent > 0 else 0
+        indent = ProgressBar.indentation()
+        n_tab_chars = indent + 2 if indent > 0 else 0
         # Also, if the terminal size is lower than 30, we set is to 30. And let's keep an additional 5 characters of margin.
         return max(min_value, terminal_size - n_tab_chars - margin)
             
         
         
+    # ------------------------ #
+    # !-- Parallel Helpers --! #
+    # ------------------------ #
+    
+    @staticmethod
+    def imap(fn, iterable, workers:int=None, backend:Literal["thread", "process"]="thread", ordered:bool=True, size:int=None):
+        """
+        Lazily apply ``fn`` to every item of ``iterable`` on a pool of
+        workers, while displaying a progress bar.
+
+        The pool is persistent: consecutive calls with the same ``backend``
+        and ``workers`` reuse the same executor. With the process backend,
+        items are sent to the workers in chunks whose size is tuned from the
+        measured per-item latency, so that the IPC overhead stays small even
+        for very cheap functions.
+
+        Parameters
+        ----------
+        fn : callable
+            Function applied to each item. Must be picklable (defined at
+            module level) for the process backend.
+        iterable : iterable
+            Items to process. It is consumed lazily.
+        workers : int, optional
+            Number of workers. Default is ``os.cpu_count()``.
+        backend : {'thread', 'process'}, optional
+            Kind of pool. Default is ``'thread'``.
+        ordered : bool, optional
+            If ``True``, results are yielded in the order of ``iterable``,
+            otherwise as soon as they are available. Default is ``True``.
+        size : int, optional
+            Number of items, if ``iterable`` has no ``__len__``.
+
+        Yields
+        ------
+        object
+            The results of ``fn``.
+        """
+        from .parallel import imap
+        return imap(fn, iterable, workers=workers, backend=backend, ordered=ordered, size=size)
+    
+    @staticmethod
+    def map(fn, iterable, workers:int=None, backend:Literal["thread", "process"]="thread", ordered:bool=True, size:int=None) -> list:
+        """
+        Same as :meth:`imap`, but return the list of all the results.
+
+        Examples
+        --------
+        >>> squares = ProgressBar.map(square, range(1000), backend="process")
+        """
+        return list(ProgressBar.imap(fn, iterable, workers=workers, backend=backend, ordered=ordered, size=size))
+    
+    @staticmethod
+    def as_completed(futures, size:int=None):
+        """
+        Yield ``futures`` as they complete, while displaying a progress bar.
+
+        Works both with ``concurrent.futures`` futures and with asyncio
+        awaitables (coroutines, tasks, futures). In the latter case, it
+        behaves like ``asyncio.as_completed``: it yields awaitables that
+        must be awaited, in completion order.
+
+        Parameters
+        ----------
+        futures : iterable of concurrent.futures.Future or of awaitables
+            The futures to wait for.
+        size : int, optional
+            Number of futures. Default is ``len(futures)``.
+
+        Examples
+        --------
+        >>> futures = [pool.submit(download, url) for url in urls]
+        >>> for future in ProgressBar.as_completed(futures):
+        ...     save(future.result())
+
+        >>> for next_page in ProgressBar.as_completed([fetch(url) for url in urls]):
+        ...     page = await next_page
+        """
+        from .parallel import as_completed, as_completed_async
+        futures = list(futures)
+        if futures and not isinstance(futures[0], ConcurrentFuture):
+            return as_completed_async(futures, size=size)
+        return as_completed(futures, size=size)
+        
+        
     # ------------- #
     # !-- Utils --! #
     # ------------- #   
@@ -357,14 +1207,21 @@ class ProgressBar(MutableClass):
         if ProgressBar.current_instance is None: # should not happen, I guess whisper is always inside a progressbar loop
             header = cstr("[%]").green()
             return ProgressBar.print(header + " " + msg)
+        
+        if ProgressBar.current_instance.region is not None:
+            # the bar lives in the region: the message simply scrolls above it
+            return ProgressBar.print(cstr("[%]").red() + " " + msg)
+        
+        if ProgressBar.current_instance.log_mode:
+            return ProgressBar.print("[%] " + msg) # the bar has no line on screen
 
         # 1. Erase the current progress bar
-        ProgressBar.current_instance.spirit.kill()  # remove the spirit from the print stack
-        header = cstr("[%]").red()
-        to_print = header + " " + msg
-        ProgressBar.current_instance._print_pb(to_print)
-        ProgressBar.current_instance.previous_print_time = -999 # so that it prints again right away
-        ProgressBar.current_instance.show()
+        with pStack.lock:
+            ProgressBar.current_instance._kill_spirit()
+            msg = " " + msg
+            ProgressBar.current_instance._print_pb([ProgressBar._colored("[%]", "red"), (msg, cstr(msg).length(), False)])
+            ProgressBar.current_instance.previous_print_time = -999 # so that it prints again right away
+            ProgressBar.current_instance.show()
         
         
     # --------------- #
@@ -446,8 +1303,57 @@ class ProgressBar(MutableClass):
             spinner_list = list(spinner_list)
         assert all(isinstance(s, str) for s in spinner_list), "All spinner elements must be strings."
         config["spinner"] = spinner_list
+    
+    @staticmethod
+    def set_mode(mode:Literal["auto", "tty", "log"] = "auto", interval:float = None, percent:float = None):
+        """
+        Choose how progress bars are displayed.
+
+        Parameters
+        ----------
+        mode : {'auto', 'tty', 'log'}, optional
+            - ``'tty'``: the bar is redrawn in place with ``'\r'``.
+            - ``'log'``: the bar prints a plain status line (no colors, no
+              ``'\r'``) every ``interval`` seconds and every ``percent``
+              percent, and a summary once done. Meant for log files, pipes
+              and batch jobs.
+            - ``'auto'`` (default): ``'tty'`` in terminals and notebooks,
+              ``'log'`` otherwise.
+        interval : float, optional
+            Seconds between two status lines in log mode. Default is 30.
+        percent : float, optional
+            Also print a status line in log mode every time a multiple of
+            this percentage is reached, once the loop has run for
+            ``interval`` seconds (0 to disable). Default is 10.
+
+        Examples
+        --------
+        >>> ProgressBar.set_mode("log", interval=10)
+        >>> for i in ProgressBar(range(1000)):
+        ...     ...
+        [16%] [10.01s > 50.24s, 16.6 it/s, 167/1000]
+        ...
+        [%] 1.00k it in 00:01:00 (16.6 it/s)
+        """
+        assert mode in ["auto", "tty", "log"], f"Invalid mode '{mode}'. Choose among 'auto', 'tty', 'log'."
+        config["display_mode"] = mode
+        if interval is not None:
+            assert interval > 0, "The interval must be positive."
+            config["log_interval"] = interval
+        if percent is not None:
+            assert percent >= 0, "The percentage must be positive."
+            config["log_percent"] = percent
         
 
+def _demo_count(n:int, counter:SharedCounter) -> None:
+    # used by the demo below: worker functions must be importable by child processes
+    for _ in range(n):
+        counter.add()
+
+def _demo_square(x:int) -> int:
+    return x * x
+
+
 if __name__ == '__main__':
     
     
@@ -494,17 +1400,18 @@ if __name__ == '__main__':
             self.print_of_max_length = ""
             
             
-        def __next__(self):
+        def __iter__(self):
+            for item in super().__iter__():
+                self._measure()
+                yield item
+            self._measure() # the final frame
+            with Message(f"Max print length was {cstr(cstr(self.print_of_max_length).length()):c} (max allowed {self.terminal_width})"):
+                Message.print(f"The print was: '{self.print_of_max_length}'")
+        
+        def _measure(self):
             if cstr(self.previous_print).length() > cstr(self.print_of_max_length).length():
                 self.print_of_max_length = self.previous_print
             
-            try:
-                return super().__next__()
-            except StopIteration:
-                with Message(f"Max print length was {cstr(cstr(self.print_of_max_length).length()):c} (max allowed {self.terminal_width})"):
-                    Message.print(f"The print was: '{self.print_of_max_length}'")
-                raise(StopIteration())
-            
         def _get_terminal_width(self, *args, **kwargs):
             return self.terminal_width  
                 
@@ -522,7 +1429,96 @@ if __name__ == '__main__':
             time.sleep(0.02)
             
             
-    # 6. Real cas escenario
+    # 6. Manual updates from several threads
+    from concurrent.futures import ThreadPoolExecutor
+    with Message("Testing manual updates from 4 threads"):
+        with ProgressBar(size=400 * 1024**2, unit="B") as pb:
+            def download(_):
+                for _ in range(100):
+                    time.sleep(0.01)
+                    pb.update(1024**2)
+            with ThreadPoolExecutor(4) as pool:
+                list(pool.map(download, range(4)))
+    
+    # 7. Manual updates from several processes
+    from concurrent.futures import ProcessPoolExecutor
+    with Message("Testing shared progress over 4 processes"):
+        with ProgressBar(size=8 * 200_000, shared=4) as pb:
+            with ProcessPoolExecutor(4) as pool:
+                list(pool.map(_demo_count, [200_000] * 8, [pb.counter] * 8))
+    
+    # 8. Parallel map
+    with Message("Testing ProgressBar.map on a process pool"):
+        squares = ProgressBar.map(_demo_square, range(1_000_000), backend="process")
+        Message.print(f"Sum of squares: {sum(squares)}")
+    
+    # 9. Asyncio
+    async def _demo_async():
+        async def fetch(i):
+            await asyncio.sleep(0.5 * (i % 7) / 7)
+            return i
+        
+        async def pages():
+            for i in range(50):
+                await asyncio.sleep(0.02)
+                yield i
+        
+        async with Task("Testing async for"):
+            async for i in ProgressBar(pages(), size=50):
+                pass
+        
+        async with Task("Testing as_completed on coroutines"):
+            for next_result in ProgressBar.as_completed([fetch(i) for i in range(100)]):
+                await next_result
+    
+    asyncio.run(_demo_async())
+    
+    # 10. Streaming an iterator of unknown size
+    with Message("Testing open-ended generator"):
+        for i in ProgressBar(x for x in range(100)):
+            time.sleep(0.02)
+    
+    # 11. Background rendering for very cheap iterations
+    with Message("Testing threaded rendering"):
+        for i in ProgressBar(range(3_000_000), threaded=True):
+            if i == 1_500_000:
+                ProgressBar.whisper("Halfway there!")
+    
+    # 12. Leaving a loop early stops its watchdog
+    with Message("Testing break and exceptions with a watchdog"):
+        for threaded in [False, True]:
+            for i in ProgressBar(range(100), watchdog=0.2, threaded=threaded):
+                if i == 10:
+                    break
+            try:
+                for i in ProgressBar(range(100), watchdog=0.2, threaded=threaded):
+                    if i == 10:
+                        raise ValueError("Leaving the loop")
+            except ValueError:
+                pass
+        time.sleep(0.05) # the watchdogs wake up and exit
+        assert not any(t.name == "oakley-watchdog" for t in threading.enumerate()), "A watchdog is still running."
+        assert ProgressBar.current_instance is None, "An abandoned bar is still the current one."
+        time.sleep(0.5) # nothing is reported
+    
+    # 13. Rendering cost: full redraw vs incremental
+    with Message("Benchmarking the renderer"):
+        n_frames = 3000
+        costs = {}
+        for incremental in [False, True]:
+            ProgressBar.incremental = incremental
+            pb = ProgressBar(range(1000 * n_frames))
+            start = time.perf_counter()
+            for frame in range(n_frames):
+                pb.count = 10 * frame # a long loop: only the stats change from one frame to the next
+                pb._add_step()
+                pb._render()
+            costs[incremental] = (time.perf_counter() - start) / n_frames
+            pb._finish()
+        ProgressBar.incremental = True
+        Message.print(f"Full redraw: {costs[False]*1e6:.1f}µs/frame, incremental: {costs[True]*1e6:.1f}µs/frame")
+    
+    # 14. Real cas escenario
     n_iters = 5000
     time_per_iter = 600 / n_iters # 10 minutes total
     with Message("Processing data..."):
@@ -0,0 +1,220 @@
+import os
+import tempfile
+import threading
+from multiprocessing import shared_memory
+try:
+    import fcntl
+except ImportError: # windows
+    fcntl = None
+    import msvcrt
+
+
+_attached = {} # name -> (SharedMemory, cells), so that a worker attaches to each block only once
+_claimed = {} # (name, pid) -> (file descriptor holding the lock, cell), the cell owned by this process
+
+
+def _open(name:str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) # python >= 3.13
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _lock_byte(fd:int, i:int) -> bool:
+    """
+    Try to lock the byte ``i`` of the file ``fd`` for this process. The
+    operating system releases the lock when the process exits, however it
+    exits.
+    """
+    try:
+        if fcntl is not None:
+            fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, i)
+        else:
+            os.lseek(fd, i, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError: # locked by another process
+        return False
+    return True
+
+
+class SharedCounter:
+    """
+    A counter that child processes increment through shared memory.
+
+    The counter is a ``multiprocessing.shared_memory`` block holding one
+    64-bit cell per process. Each process only writes to its own cell, so
+    increments need no IPC: ``add`` is a memory write, under a lock only
+    shared by the threads of the process. The parent reads the total (or
+    the per-process breakdown) by summing the cells.
+
+    The object is picklable: sending it to a worker (as an argument of
+    ``ProcessPoolExecutor.submit``, ``Pool.map``, ``Process``...) attaches
+    the worker to the same block.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Maximal number of worker processes incrementing the counter. Default
+        is ``os.cpu_count()``. An additional process raises a
+        ``RuntimeError`` on its first :meth:`add`.
+
+    Notes
+    -----
+    - Cell 0 belongs to the process that created the counter. Each worker
+      process claims a free cell on its first :meth:`add`, and keeps it
+      until it exits. The claim of cell ``i`` is a lock on the byte ``i``
+      of a small file: two living processes never get the same cell, and
+      the cell of a worker that exited (or was terminated) is free again.
+      A worker replacing another one continues the count of its cell.
+    - The creator must call :meth:`unlink` once done (`ProgressBar` does it
+      when it closes).
+
+    Examples
+    --------
+    >>> counter = SharedCounter()
+    >>> with ProcessPoolExecutor() as pool:
+    ...     pool.map(work, chunks, [counter] * len(chunks))
+    >>> counter.value()
+    """
+
+    def __init__(self, workers:int = None) -> None:
+        self.n_cells = (workers or os.cpu_count() or 1) + 1
+        self._shm = shared_memory.SharedMemory(create=True, size=8 * self.n_cells)
+        self._cells = self._shm.buf.cast("Q")
+        for i in range(self.n_cells):
+            self._cells[i] = 0
+        self._owner_pid = os.getpid()
+        self._cell = None
+        self._lock = threading.Lock() # between the threads of this process
+        self._final = None # values kept once the block is freed
+
+    # ---------------- #
+    # !-- Pickling --! #
+    # ---------------- #
+
+    def __getstate__(self) -> dict:
+        return {"name": self._shm.name, "n_cells": self.n_cells, "owner_pid": self._owner_pid}
+
+    def __setstate__(self, state:dict) -> None:
+        self.n_cells = state["n_cells"]
+        self._owner_pid = state["owner_pid"]
+        if state["name"] not in _attached:
+            shm = _open(state["name"])
+            _attached[state["name"]] = (shm, shm.buf.cast("Q"))
+        self._shm, self._cells = _attached[state["name"]]
+        self._cell = None
+        self._lock = threading.Lock()
+        self._final = None
+
+    # ---------------- #
+    # !-- Counting --! #
+    # ---------------- #
+
+    def add(self, n:int = 1) -> None:
+        """
+        Increment the calling process's cell by ``n``.
+        """
+        with self._lock: # += is a read-modify-write
+            cell = self._cell
+            if cell is None:
+                cell = self._cell = self._find_cell()
+            self._cells[cell] += n
+
+    def _find_cell(self) -> int:
+        if os.getpid() == self._owner_pid:
+            return 0
+        key = (self._shm.name, os.getpid()) # the pid: a forked child does not own the cell of its parent
+        if key not in _claimed:
+            fd = os.open(self._claims_path(), os.O_RDWR | os.O_CREAT, 0o600)
+            for cell in range(1, self.n_cells):
+                if _lock_byte(fd, cell):
+                    _claimed[key] = (fd, cell) # never closed: closing the file would release the lock
+                    break
+            else:
+                os.close(fd)
+                raise RuntimeError(
+                    f"The {self.n_cells - 1} cells of the shared counter are all used by other processes: "
+                    f"create it for more workers (e.g. ProgressBar(..., shared={2 * (self.n_cells - 1)}))."
+                )
+        return _claimed[key][1]
+
+    def _claims_path(self) -> str:
+        return os.path.join(tempfile.gettempdir(), f"oakley_{self._shm.name.lstrip('/')}.cells")
+
+    def value(self) -> int:
+        """
+        Return the total over all processes.
+        """
+        return sum(self.values())
+
+    def values(self) -> list:
+        """
+        Return the count of each cell, the first one being the creator's.
+        """
+        if self._cells is None:
+            return self._final or [0] * self.n_cells
+        return list(self._cells)
+
+    # --------------- #
+    # !-- Cleanup --! #
+    # --------------- #
+
+    def close(self) -> None:
+        """
+        Detach this process from the shared memory block.
+        """
+        if self._cells is None:
+            return
+        self._final = list(self._cells)
+        if os.getpid() == self._owner_pid:
+            self._cells.release()
+            self._shm.close()
+        # workers keep their (cached) attachment until they exit
+        self._cells = None
+
+    def unlink(self) -> None:
+        """
+        Free the shared memory block. Only the creator should call this.
+        """
+        self.close()
+        if os.getpid() == self._owner_pid:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            try:
+                os.remove(self._claims_path()) # the claims of the workers
+            except OSError:
+                pass
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+
+def _demo_work(n:int, counter:SharedCounter) -> None:
+    for _ in range(n):
+        counter.add()
+
+
+if __name__ == '__main__':
+    from concurrent.futures import ProcessPoolExecutor
+
+    counter = SharedCounter(workers=4)
+    with ProcessPoolExecutor(4) as pool:
+        list(pool.map(_demo_work, [100_000] * 8, [counter] * 8))
+
+    print(f"Expected {8 * 100_000}, got {counter.value()} ({counter.values()})")
+    counter.unlink()
+
+    # more workers than cells: an error, never a silent miscount
+    counter = SharedCounter(workers=2)
+    try:
+        with ProcessPoolExecutor(8) as pool:
+            list(pool.map(_demo_work, [100_000] * 32, [counter] * 32))
+    except RuntimeError as e:
+        print(f"RuntimeError: {e}")
+    counter.unlink()
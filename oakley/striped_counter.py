@@ -0,0 +1,65 @@
+import threading
+
+
+class StripedCounter:
+    """
+    A counter that many threads can increment concurrently without sharing
+    a lock.
+
+    Each thread writes to its own cell (a one-element list stored in a
+    ``threading.local``), so increments never contend with each other and
+    are never lost: a cell only ever has one writer. Reading the value sums
+    all the cells, which is cheap as long as the number of threads stays
+    reasonable. The lock is only taken the first time a thread increments
+    the counter, to register its cell.
+
+    Examples
+    --------
+    >>> counter = StripedCounter()
+    >>> counter.add(3)
+    >>> counter.add()
+    >>> counter.value()
+    4
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._cells = []
+        self._lock = threading.Lock()
+
+    def add(self, n:int = 1) -> None:
+        """
+        Increment the calling thread's cell by ``n``.
+        """
+        try:
+            self._local.cell[0] += n
+        except AttributeError:
+            self._register()[0] += n
+
+    def _register(self) -> list:
+        cell = self._local.cell = [0]
+        with self._lock:
+            self._cells.append(cell) # cells are kept after the thread ends, so that its increments are not lost
+        return cell
+
+    def value(self) -> int:
+        """
+        Return the sum of all cells.
+        """
+        return sum(cell[0] for cell in self._cells)
+
+
+
+if __name__ == '__main__':
+    from concurrent.futures import ThreadPoolExecutor
+
+    counter = StripedCounter()
+
+    def work(_):
+        for _ in range(100_000):
+            counter.add()
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(work, range(16)))
+
+    print(f"Expected {16 * 100_000}, got {counter.value()}")
@@ -3,8 +3,25 @@ from .mutable_class import MutableClass
 from .fancy_string import cstr
 from .fancy_context_manager import FancyCM   
 from typing import Literal
+import sys
 import time
-from .print_stack import in_notebook, _notebook_is_unknown
+import asyncio
+import threading
+import contextvars
+from .print_stack import in_notebook, _notebook_is_unknown, pStack
+from .live_region import LiveRegion
+from .history import History
+from .watchdog import Watchdog
+from .profiler import SamplingProfiler
+from .trace import Trace
+from .timings import Timings
+from .resources import ResourceUsage
+from .loop_monitor import LoopMonitor
+from .bench import Benchmark
+from .cache import Cache
+from .graph import TaskGraph
+from .message import Message
+from .config import config
 
 
 class Task(MutableClass):
@@ -27,6 +44,25 @@ class Task(MutableClass):
     ----------
     msg : str
         The descriptive message for the task.
+    watchdog : float, optional
+        Print the stack of the task's thread whenever it makes no progress
+        for this many seconds (see :class:`oakley.watchdog.Watchdog`).
+        Default is ``None``.
+    profile : bool or str, optional
+        Profile the task by sampling its stack, and print its hottest
+        functions once it ends (see :class:`oakley.profiler.SamplingProfiler`).
+        A string is the path of a collapsed-stack file to write. Default is
+        ``False``.
+    resources : bool or str, optional
+        Print the CPU, memory and I/O used during the task (see
+        :class:`oakley.resources.ResourceUsage`); ``"memory"`` also traces
+        the peak of the Python allocations. Default is ``False``.
+    loop_lag : bool, optional
+        Measure the lag of the running event loop during the task (see
+        :class:`oakley.loop_monitor.LoopMonitor`). Default is ``False``.
+    aggregate : bool, optional
+        Print nothing, and add the duration to the statistics of ``msg`` in
+        :class:`oakley.Timings`. Default is ``False``.
 
     
     Notes
@@ -34,6 +70,12 @@ class Task(MutableClass):
     - `Task` must be used as a context manager using ``with Task(...):``.
     - If an exception occurs inside the ``with`` block, the task is marked
       as aborted and the exception is re-raised after printing diagnostics.
+    - Running tasks are tracked per thread and per asyncio task (see
+      :meth:`current`); use :meth:`propagate` to run a worker thread under
+      the current task.
+    - See also :meth:`timed`, :meth:`cached`, :meth:`graph`, :meth:`bench`
+      and :meth:`compare`, and :class:`oakley.History` and
+      :class:`oakley.Trace`, which record tasks once enabled.
     
     Examples
     --------
@@ -42,12 +84,17 @@ class Task(MutableClass):
     >>> with Task("Compute something heavy"):
     ...     expensive_function()
 
+    Inside a coroutine (printing is offloaded to a worker thread):
+
+    >>> async with Task("Crawl"):
+    ...     await crawl()
+
     """
     
-    running_tasks = []
+    running_tasks = contextvars.ContextVar("oakley_running_tasks", default=()) # innermost last, local to the thread or asyncio task
     last_task_runtime = None
     
-    def __init__(self, msg:str) -> None:
+    def __init__(self, msg:str, watchdog:float = None, profile:'bool|str' = False, resources:'bool|str' = False, loop_lag:bool = False, aggregate:bool = False) -> None:
         """
         Initialize a new task wrapper.
 
@@ -55,31 +102,410 @@ class Task(MutableClass):
         ----------
         msg : str
             The message describing the task being executed.
+        watchdog : float, optional
+            Seconds without progress before the stack is printed.
+        profile : bool or str, optional
+            Profile the task (and write a collapsed-stack file if a path is
+            given).
+        resources : bool or str, optional
+            Report the resources used (``"memory"`` to also trace the peak
+            of Python allocations).
+        loop_lag : bool, optional
+            Monitor the lag of the running event loop.
+        aggregate : bool, optional
+            Only record the duration in the timing statistics.
         """
+        assert watchdog is None or watchdog > 0, "The watchdog timeout must be positive."
         self.msg = msg
+        self.aggregate = aggregate
+        if aggregate:
+            assert watchdog is None and not profile and not resources and not loop_lag, "Aggregated tasks cannot be watched or profiled."
+            return # the block may run many times: nothing else is needed
         self.spirit = self.create_spirit("") # placeholder spirit
+        self.region = None
+        self.watchdog_timeout = watchdog
+        self.watchdog = None
+        self.thread_id = None # thread running the task, set on enter
+        self.profile = profile
+        self.profiler = None
+        self.span = None # trace token, see Trace.begin
+        assert resources in (True, False, "memory"), "resources must be a boolean or 'memory'."
+        self.resources = resources
+        self.resource_usage = None # ResourceUsage while running, then the dictionary of its results
+        self.loop_lag = loop_lag
+        self.loop_monitor = None
+        if loop_lag:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                raise AssertionError("Task(..., loop_lag=True) requires a running event loop.") from None
        
     def _complete(self) -> None:
         Task.last_task_runtime = time.time() - self.start_time
+        delta_str, regression_msg = self._compare_history(Task.last_task_runtime)
         
-        if not self.spirit.is_alive():
+        if self.region is not None:
+            self._leave_region(
+                cstr('[~]').blue(), self.msg, f"({cstr(self.time(Task.last_task_runtime)).blue()}{delta_str})"
+            )
+        elif not self.spirit.is_alive():
             self.print(
-                cstr('[~]').blue(), "Task completed after:", cstr(self.time(Task.last_task_runtime)).blue()
+                cstr('[~]').blue(), "Task completed after:", f"{cstr(self.time(Task.last_task_runtime)).blue()}{delta_str}"
             )
         else:
             self.spirit.kill()
             self.print(
-                f" ({cstr(self.time(time.time()-self.start_time)).blue()})", ignore_tabs=True
+                f" ({cstr(self.time(Task.last_task_runtime)).blue()}{delta_str})", ignore_tabs=True
             )
+        
+        if regression_msg is not None:
+            Task.untab() # at the level of the task header
+            Message(regression_msg, "?")
+            Task.tab()
     
-    def _abort(self) -> None:        
+    def _compare_history(self, duration:float) -> tuple[str, str|None]:
+        """
+        Record the run in the history, if enabled, and compare it with the
+        previous ones. Returns the ``", +12% vs. last run"`` suffix (empty if
+        there is no previous run) and the regression warning, if any.
+        """
+        if not History.enabled():
+            return "", None
+        delta, usual, regression = History.compare("task", self.msg, duration)
+        History.record("task", self.msg, duration)
+        
+        delta_str = ""
+        if delta is not None:
+            delta_str = cstr(f"{delta:+.0%}")
+            delta_str = delta_str.red() if delta > config["regression_threshold"] else delta_str.green() if delta < 0 else delta_str
+            delta_str = f", {delta_str} vs. last run"
+        regression_msg = None
+        if regression is not None:
+            regression_msg = f"{self.msg} was {regression:.0%} slower than usual ({self.time(duration)} vs. {self.time(usual)})"
+        return delta_str, regression_msg
+    
+    def _abort(self) -> None:
+        if self.region is not None:
+            return self._leave_region(
+                cstr('[!]').red(), self.msg, "aborted after:", cstr(self.time(time.time()-self.start_time)).red()
+            )
+        
         self.print() # we might still be on the line of the first print statement of the Task function, don't stay on the same line
 
         self.print(
             cstr('[!]').red(), "Task aborted after:", cstr(self.time(time.time()-self.start_time)).red()
         )
+
+    
+    
+    ##############
+    ### Timing ###
+    ##############
+    
+    @staticmethod
+    def timed(func=None, name:str = None):
+        """
+        Decorator recording the duration of each call of the function in
+        :class:`oakley.Timings`, without printing anything.
+
+        Parameters
+        ----------
+        func : callable
+            The function (or coroutine function) to time.
+        name : str, optional
+            Name of the entry in the statistics. Default is the qualified
+            name of the function.
+
+        Examples
+        --------
+        >>> @Task.timed
+        ... def parse(line): ...
+        >>> @Task.timed(name="db query")
+        ... async def query(sql): ...
+        """
+        if isinstance(func, str): # @Task.timed("name")
+            func, name = None, func
+        if func is None:
+            return lambda func: Timings.wrap(func, name)
+        return Timings.wrap(func, name)
+    
+    
+    ###############
+    ### Caching ###
+    ###############
+    
+    @staticmethod
+    def cached(func=None, name:str = None, source:bool = True):
+        """
+        Decorator memoizing the results of a function on disk (see
+        :class:`oakley.cache.Cache`), e.g. for loading stages re-run after
+        every restart. Each call is displayed as a task; a cache hit is
+        displayed as ``[~] Load (cached, 0.02s)``.
+
+        Parameters
+        ----------
+        func : callable
+            The function to memoize. Its arguments must be picklable.
+        name : str, optional
+            Name of the task, also part of the cache key. Default is the
+            qualified name of the function.
+        source : bool, optional
+            Include the source of the function in the cache key, so that
+            editing it invalidates the cache. Default is ``True``.
+
+        Examples
+        --------
+        >>> @Task.cached
+        ... def load(path): ...
+        >>> @Task.cached("Load features", source=False)
+        ... def features(df): ...
+        """
+        if isinstance(func, str): # @Task.cached("name")
+            func, name = None, func
+        if func is None:
+            return lambda func: Cache.memoize(func, name, source)
+        return Cache.memoize(func, name, source)
+    
+    @staticmethod
+    def _print_cached(name:str, duration:float) -> None:
+        Task.print(cstr('[~]').blue(), name, f"({cstr('cached').green()}, {cstr(Task.time(duration)).blue()})")
+    
+    
+    ##############
+    ### Graphs ###
+    ##############
+    
+    @staticmethod
+    def graph(msg:str, workers:int = None, backend:Literal["thread", "process"] = "thread") -> TaskGraph:
+        """
+        Return an empty :class:`oakley.graph.TaskGraph`: tasks declared with
+        their dependencies, run in parallel by ``graph.run()`` under a task
+        named ``msg``, each with its output grouped under its own header,
+        followed by the critical path and the slack of each task.
+
+        Parameters
+        ----------
+        msg : str
+            Name of the task running the graph.
+        workers : int, optional
+            Number of workers. Default is the number of CPUs.
+        backend : {"thread", "process"}, optional
+            Pool running the tasks. Default is ``"thread"``.
+
+        Examples
+        --------
+        >>> graph = Task.graph("Pipeline")
+        >>> raw = graph.add("Download", download, url)
+        >>> graph.add("Clean", clean, raw) # clean(result of download)
+        >>> graph.add("Index", index, after=[raw])
+        >>> results = graph.run()
+        """
+        return TaskGraph(msg, workers, backend)
+    
+    
+    ####################
+    ### Benchmarking ###
+    ####################
+    
+    @staticmethod
+    def bench(fn, *args, repeat:int = 20, warmup:int = 1, number:int = None, disable_gc:bool = False, **kwargs) -> dict:
+        """
+        Benchmark ``fn(*args, **kwargs)`` and print the time per call.
+
+        The number of calls per run is chosen automatically, and the cost of
+        the loop and of the call itself is subtracted (see
+        :class:`oakley.bench.Benchmark`).
+
+        Parameters
+        ----------
+        fn : callable
+            The function to measure.
+        repeat : int, optional
+            Number of runs. Default is 20.
+        warmup : int, optional
+            Calls before measuring. Default is 1.
+        number : int, optional
+            Calls per run. Default is automatic.
+        disable_gc : bool, optional
+            Disable the garbage collector while measuring. Default is
+            ``False``.
+
+        Returns
+        -------
+        dict
+            See :meth:`Benchmark.run`: ``min``, ``median`` and ``mad`` of the
+            time per call, in seconds...
+
+        Examples
+        --------
+        >>> Task.bench(sorted, data)
+        [~] Benchmark sorted
+         > [b] sorted  41.9µs ± 350ns per call, min 41.2µs (20 runs of 500 calls)
+         > [~] Task completed after: 0.514s
+        """
+        with Task(f"Benchmark {getattr(fn, '__qualname__', repr(fn))}"):
+            result = Benchmark.run(fn, *args, repeat=repeat, warmup=warmup, number=number, disable_gc=disable_gc, **kwargs)
+            Task._print_bench(result)
+        return result
+    
+    @staticmethod
+    def compare(fn_a, fn_b, *args, repeat:int = 20, warmup:int = 1, disable_gc:bool = False, **kwargs) -> dict:
+        """
+        Benchmark two implementations with the same arguments, and print
+        which one is faster, if the difference is statistically significant
+        (Mann-Whitney U test, ``p < Benchmark.significance``).
+
+        Parameters
+        ----------
+        fn_a, fn_b : callable
+            The two implementations.
+        repeat, warmup, disable_gc :
+            See :meth:`bench`.
+
+        Returns
+        -------
+        dict
+            See :meth:`Benchmark.compare`: ``a``, ``b``, ``speedup`` (above 1
+            if ``fn_b`` is faster) and ``p_value``.
+
+        Examples
+        --------
+        >>> Task.compare(parse_v1, parse_v2, line)
+        [~] Compare parse_v1 and parse_v2
+         > [b] parse_v1  12.3µs ± 210ns per call, min 12.0µs (20 runs of 2000 calls)
+         > [b] parse_v2  9.80µs ± 150ns per call, min 9.71µs (20 runs of 2000 calls)
+         > [#] parse_v2 is 1.26x faster than parse_v1 (p = 1.2e-07)
+         > [~] Task completed after: 1.121s
+        """
+        name_a, name_b = (getattr(fn, "__qualname__", repr(fn)) for fn in (fn_a, fn_b))
+        with Task(f"Compare {name_a} and {name_b}"):
+            result = Benchmark.compare(fn_a, fn_b, *args, repeat=repeat, warmup=warmup, disable_gc=disable_gc, **kwargs)
+            a, b = result["a"], result["b"]
+            width = max(len(a["name"]), len(b["name"]))
+            Task._print_bench(a, width)
+            Task._print_bench(b, width)
+            fast, slow = (b, a) if result["speedup"] >= 1 else (a, b)
+            ratio = slow["median"] / fast["median"] if fast["median"] > 0 else float("inf")
+            if result["p_value"] < Benchmark.significance:
+                Message(f"{fast['name']} is {ratio:.2f}x faster than {slow['name']} (p = {result['p_value']:.2g})", "#")
+            else:
+                Message(f"No significant difference ({ratio:.2f}x, p = {result['p_value']:.2g})", "i")
+        return result
+    
+    @staticmethod
+    def _print_bench(result:dict, width:int = 0) -> None:
+        t = Task.precise_time
+        Task.print(
+            cstr("[b]").magenta(),
+            f"{result['name']:<{width}}  {t(result['median'])} ± {t(result['mad'])} per call, min {t(result['min'])}",
+            f"({result['repeat']} runs of {result['number']} calls)"
+        )
+    
+    
+    #################
+    ### Resources ###
+    #################
+    
+    def _print_resources(self) -> None:
+        """
+        Print the resources used during the task, under it.
+        """
+        usage = self.resource_usage
+        prefix = cstr("[r]").magenta()
+        size = self.bytes
         
-        # assert self.__class__.running_tasks.pop() == self, "The task was not removed from the list of running tasks. This should not happen."
+        line = f"CPU {self.precise_time(usage['cpu']) if usage['cpu'] > 0 else '0s'}"
+        if usage["wall"] >= 0.1: # the CPU time is only counted in clock ticks (~10ms)
+            kind = "CPU-bound" if usage["cpu_percent"] >= 0.8 else "mostly waiting" if usage["cpu_percent"] < 0.3 else "mixed"
+            line += f" ({usage['cpu_percent']:.0%}, {kind})"
+        line += f", RSS {'+' if usage['rss_delta'] >= 0 else ''}{size(usage['rss_delta'])}"
+        if usage["peak_traced"] is not None:
+            line += f", Python allocations peak {size(usage['peak_traced'])}"
+        self.print(prefix, line)
+        
+        line = f"context switches {usage['voluntary_switches']} voluntary / {usage['involuntary_switches']} involuntary"
+        if usage["read_bytes"] is not None:
+            line = f"I/O {size(usage['read_bytes'])} read, {size(usage['write_bytes'])} written, " + line
+        self.print(prefix, line)
+    
+    
+    def _print_loop_lag(self) -> None:
+        """
+        Print the lag of the event loop during the task, under it.
+        """
+        summary = self.loop_monitor.summary()
+        prefix = cstr("[l]").magenta()
+        if summary["probes"] == 0:
+            return self.print(prefix, "event loop lag: no probe, the task was too short")
+        t = self.precise_time
+        self.print(prefix, f"event loop lag: max {t(summary['max'])}, p99 {t(summary['p99'])} ({summary['probes']} probes)")
+    
+    
+    #################
+    ### Profiling ###
+    #################
+    
+    def _print_profile(self) -> None:
+        """
+        Print the hottest functions and call paths, under the task.
+        """
+        profiler = self.profiler
+        self.profiler = None
+        prefix = cstr("[p]").magenta()
+        top = config["profile_top"]
+        if isinstance(self.profile, str):
+            profiler.write_collapsed(self.profile)
+        
+        if profiler.n_samples == 0:
+            return self.print(prefix, "no samples, the task was too short to be profiled")
+        self.print(prefix, f"{profiler.n_samples} samples, every {self.precise_time(profiler.interval)}")
+        self.print(prefix, f"{'self':>5}  {'total':>5}  function")
+        for name, own, total in profiler.functions()[:top]:
+            self.print(prefix, f"{own:5.1%}  {total:5.1%}  {name}")
+        self.print(prefix, "hottest paths:")
+        for path, share in profiler.paths()[:top]:
+            self.print(prefix, f"{share:5.1%}  {path}")
+        if isinstance(self.profile, str):
+            self.print(prefix, f"collapsed stacks written to {cstr(self.profile):g}")
+    
+    
+    @staticmethod
+    def current() -> 'Task|None':
+        """
+        Return the innermost task running in this thread or asyncio task,
+        ``None`` if there is none.
+        """
+        running = Task.running_tasks.get()
+        return running[-1] if running else None
+    
+    def _parent_span(self) -> int|None:
+        """
+        Id of the trace span of the task enclosing this one, if any.
+        """
+        running = [task for task in Task.running_tasks.get() if task is not self]
+        return running[-1].span[0] if running and running[-1].span is not None else None
+    
+    
+    ###################
+    ### Live Region ###
+    ###################
+    
+    def _live_line(self) -> str:
+        """
+        Status line displayed in the live region while the task runs.
+        """
+        return f"{cstr('[~]').blue()} {self.msg} ({cstr(self.time(time.time()-self.start_time)).blue()})"
+    
+    def _leave_region(self, *args) -> None:
+        """
+        Remove the status line from the live region, and print ``args`` at
+        the indentation level of the task header.
+        """
+        with pStack.lock:
+            self.region.remove(self)
+            Task.untab()
+            self.print(*args)
+            Task.tab()
     
     
     #######################
@@ -87,7 +513,31 @@ class Task(MutableClass):
     #######################
     
     def __enter__(self):
-        self.__class__.running_tasks.append(self)
+        if self.aggregate:
+            self.start_ns = time.perf_counter_ns()
+            return
+        Task.running_tasks.set(Task.running_tasks.get() + (self,))
+        self.region = LiveRegion.current()
+        self.start_time = time.time()
+        self.thread_id = self.thread_id or threading.get_ident()
+        if self.watchdog_timeout is not None:
+            self.watchdog = Watchdog(
+                self, lambda task: Watchdog.frame_signature(task.thread_id), self.watchdog_timeout, self.msg, self.thread_id
+            )
+        if self.resources:
+            self.resource_usage = ResourceUsage(memory=self.resources == "memory")
+
+        if self.profile:
+            # in a coroutine, __enter__ runs in a worker thread: no anchor frame then
+            anchor = sys._getframe(1) if self.thread_id == threading.get_ident() else None
+            self.profiler = SamplingProfiler(self.thread_id, config["profile_interval"], anchor).start()
+        
+        if self.region is not None:
+            self.region.add(self) # the header is a live status line
+            self.span = Trace.begin(self._parent_span()) if Trace.enabled() else None
+            super().__enter__() # add to the indentation level
+            return
+        
         self.print(
             cstr('[~]').blue(), self.msg, end=''
         )
@@ -98,14 +548,52 @@ class Task(MutableClass):
             Task.print(self.spirit.kill(), end='') # go to new line immediately
         
         self.start_time = time.time()
+        self.span = Trace.begin(self._parent_span()) if Trace.enabled() else None
         super().__enter__() # add to the indentation level
+        if self.loop_lag and self.thread_id == threading.get_ident(): # in a coroutine, started by __aenter__
+            self.loop_monitor = LoopMonitor().start() # after the indentation, for the warnings
     
     def __exit__(self, exc_type, exc_value, traceback):
+        if self.aggregate:
+            return Timings.record(self.msg, time.perf_counter_ns() - self.start_ns)
+        Task.running_tasks.set(tuple(task for task in Task.running_tasks.get() if task is not self))
+        if self.span is not None:
+            Trace.end(self.span, self.msg, "task", self.thread_id, None if exc_type is None else {"aborted": True})
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        if self.profiler is not None:
+            self.profiler.stop()
+        if self.resource_usage is not None:
+            self.resource_usage = self.resource_usage.stop()
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop() # already done by __aexit__ in a coroutine
         if exc_type is None:
             self._complete()
         else:
             self._abort()
+        if self.resource_usage is not None:
+            self._print_resources()
+        if self.loop_monitor is not None:
+            self._print_loop_lag()
+        if self.profiler is not None:
+            self._print_profile()
         super().__exit__(exc_type, exc_value, traceback) # rmeoves the indentation level and handles the exception if any
+    
+    async def __aenter__(self):
+        if self.aggregate:
+            return self.__enter__() # nothing is printed: no need for a worker thread
+        self.thread_id = threading.get_ident() # the event loop's thread, not the worker running __enter__
+        await self._in_thread(self.__enter__) # the indentation is kept in the coroutine's context
+        if self.loop_lag:
+            self.loop_monitor = LoopMonitor().start() # from the loop's thread
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self.aggregate:
+            return self.__exit__(exc_type, exc_value, traceback)
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop() # from the loop's thread
+        await self._in_thread(self.__exit__, exc_type, exc_value, traceback)
         
     
     
@@ -0,0 +1,155 @@
+import time
+import shutil
+import signal
+import threading
+
+from .config import config
+from .print_stack import pStack, in_notebook
+
+
+class Terminal:
+    """
+    Cached terminal geometry, shared by all Oakley classes.
+
+    Asking the operating system for the terminal size costs a system call,
+    which adds up when progress bars redraw themselves many times per
+    second. `Terminal` keeps the width, the height and the TTY capability
+    in cache, and only refreshes them when the terminal is resized: on
+    ``SIGWINCH`` where signals are available, otherwise (Windows, or when
+    Oakley is imported from another thread than the main one) by polling at
+    most every :attr:`poll_interval` seconds.
+
+    Notes
+    -----
+    - When the size cannot be determined (e.g. in a notebook), the width is
+      999 columns, meaning "no limit".
+    - ``config["terminal_width"]``, when positive, caps the width returned
+      by :meth:`width` (see :meth:`ProgressBar.set_size`).
+    - The TTY capability is cached per output stream: it is checked again
+      if the stream underlying ``pStack`` is replaced.
+    - The previous ``SIGWINCH`` handler, if any, is still called.
+
+    Examples
+    --------
+    >>> Terminal.width()
+    120
+    >>> Terminal.size()
+    (120, 40)
+    """
+
+    poll_interval = 1.0 # seconds, only used when SIGWINCH is not available
+
+    _columns = 999
+    _lines = 20
+    _dirty = True # set by the SIGWINCH handler
+    _last_refresh = float("-inf")
+    _signal_installed = False
+    _tty = (None, False) # (stream, isatty)
+    _previous_handler = None
+
+    @staticmethod
+    def size() -> tuple[int, int]:
+        """
+        Return the ``(columns, lines)`` of the terminal, from the cache.
+        """
+        if Terminal._dirty or (
+            not Terminal._signal_installed and time.monotonic() - Terminal._last_refresh > Terminal.poll_interval
+        ):
+            Terminal.refresh()
+        return Terminal._columns, Terminal._lines
+
+    @staticmethod
+    def width(ignore_config:bool = False) -> int:
+        """
+        Return the number of columns, capped by ``config["terminal_width"]``
+        unless ``ignore_config`` is set.
+        """
+        columns = Terminal.size()[0]
+        if config["terminal_width"] > 0 and not ignore_config:
+            columns = min(columns, config["terminal_width"]) # if terminal size lower than provided, keep the low one
+        return columns
+
+    @staticmethod
+    def height() -> int:
+        """
+        Return the number of lines.
+        """
+        return Terminal.size()[1]
+
+    @staticmethod
+    def isatty() -> bool:
+        """
+        Whether the standard output is a terminal (never while the output
+        is captured, see :meth:`PrintListener.capturing`).
+        """
+        if pStack.capturing():
+            return False
+        stream, tty = Terminal._tty
+        if stream is not pStack.original_stdout:
+            stream = pStack.original_stdout
+            try:
+                tty = stream.isatty()
+            except (AttributeError, ValueError):
+                tty = False
+            Terminal._tty = (stream, tty)
+        return tty
+
+    @staticmethod
+    def interactive() -> bool:
+        """
+        Whether bars should be redrawn in place (``"tty"`` display mode) or
+        printed as periodic plain lines (``"log"`` mode, for files, pipes,
+        batch schedulers...). Given by ``config["display_mode"]``; in
+        ``"auto"`` mode, notebooks and terminals are interactive.
+        """
+        mode = config["display_mode"]
+        if mode == "auto":
+            return in_notebook or Terminal.isatty()
+        return mode == "tty"
+
+    @staticmethod
+    def refresh() -> None:
+        """
+        Query the operating system for the terminal size.
+        """
+        Terminal._dirty = False
+        Terminal._last_refresh = time.monotonic()
+        Terminal._columns, Terminal._lines = shutil.get_terminal_size((999, 20))
+
+    # ---------------- #
+    # !-- SIGWINCH --! #
+    # ---------------- #
+
+    @staticmethod
+    def _on_resize(signum, frame) -> None:
+        Terminal._dirty = True # only flag it: the size is read lazily, outside of the signal handler
+        if callable(Terminal._previous_handler):
+            Terminal._previous_handler(signum, frame)
+
+    @staticmethod
+    def _install() -> None:
+        """
+        Install the ``SIGWINCH`` handler, if signals are available here.
+        """
+        if not hasattr(signal, "SIGWINCH") or threading.current_thread() is not threading.main_thread():
+            return
+        try:
+            Terminal._previous_handler = signal.signal(signal.SIGWINCH, Terminal._on_resize)
+            Terminal._signal_installed = True
+        except (ValueError, OSError):
+            pass
+
+
+Terminal._install()
+
+
+
+if __name__ == '__main__':
+    print(f"Terminal size: {Terminal.size()}, tty: {Terminal.isatty()}, SIGWINCH: {Terminal._signal_installed}")
+    print("Resize your terminal within the next 10 seconds...")
+    previous = Terminal.size()
+    for _ in range(100):
+        time.sleep(0.1)
+        if Terminal.size() != previous:
+            previous = Terminal.size()
+            print(f"New size: {previous}")
@@ -0,0 +1,146 @@
+import sys
+import time
+import weakref
+import threading
+import traceback
+
+from .print_stack import pStack
+from .mutable_class import MutableClass
+
+
+class Watchdog:
+    """
+    Background thread that reports where a loop or a task is stuck.
+
+    The watchdog periodically samples a *progress signature* of the object
+    it watches (the count of a `ProgressBar`, the current frame of a `Task`).
+    When the signature has not changed for ``timeout`` seconds, it prints
+    the current stack of the watched thread through
+    :meth:`ProgressBar.whisper`, then again after ``2 * timeout``,
+    ``4 * timeout``... of stall (exponential backoff).
+
+    While progress is healthy, the thread only wakes up every
+    ``timeout / 2`` seconds to read the signature: nothing is added to the
+    loop itself.
+
+    Parameters
+    ----------
+    owner : object
+        The watched object. Only a weak reference is kept: the watchdog
+        stops by itself once the object is garbage collected (e.g. a loop
+        left with ``break``).
+    progress : callable
+        ``progress(owner)`` returns the progress signature (any comparable
+        value).
+    timeout : float
+        Seconds without progress before the first report.
+    label : str
+        Name of the watched object in the reports.
+    thread_id : int, optional
+        Identifier of the thread whose stack is printed. Default is the
+        thread creating the watchdog (the one running the loop or the task).
+
+    Examples
+    --------
+    >>> for path in ProgressBar(paths, watchdog=60):
+    ...     read(path) # if a read hangs for 60s, its stack is printed
+    """
+
+    max_frames = 12 # innermost frames printed in a report
+
+    def __init__(self, owner, progress, timeout:float, label:str, thread_id:int = None) -> None:
+        assert timeout > 0, "The watchdog timeout must be positive."
+        self._owner = weakref.ref(owner)
+        self._progress = progress
+        self.timeout = timeout
+        self.label = label
+        self.thread_id = thread_id or threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=MutableClass.propagate(self._loop), name="oakley-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop watching. Does not wait for the thread.
+        """
+        self._stop.set()
+
+    # ---------------- #
+    # !-- Watching --! #
+    # ---------------- #
+
+    def _signature(self):
+        owner = self._owner()
+        if owner is None:
+            return None
+        return self._progress(owner)
+
+    def _loop(self) -> None:
+        signature = self._signature()
+        last_progress = time.monotonic()
+        n_reports = 0
+        wait = self.timeout / 2
+        while not self._stop.wait(wait):
+            if self._owner() is None:
+                return
+            new_signature = self._signature()
+            now = time.monotonic()
+            if new_signature != signature:
+                signature = new_signature
+                last_progress = now
+                n_reports = 0
+                wait = self.timeout / 2
+                continue
+            stalled = now - last_progress
+            next_report = self.timeout * 2 ** n_reports
+            if stalled >= next_report:
+                self._report(stalled)
+                n_reports += 1
+                next_report = self.timeout * 2 ** n_reports
+            wait = max(self.timeout / 2, next_report - stalled)
+
+    def _report(self, stalled:float) -> None:
+        from .progress_bar import ProgressBar # circular import: the progress bar uses the watchdog
+
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return # the thread is gone
+        lines = [f"{self.label}: no progress for {ProgressBar.short_time(stalled)}, the thread is at:"]
+        for entry in traceback.format_stack(frame, limit=Watchdog.max_frames):
+            lines.extend(entry.rstrip("\n").split("\n"))
+        del frame
+        with pStack.lock: # the report must not be interleaved with other outputs
+            for line in lines:
+                ProgressBar.whisper(line)
+
+    # --------------------------- #
+    # !-- Progress signatures --! #
+    # --------------------------- #
+
+    @staticmethod
+    def frame_signature(thread_id:int):
+        """
+        Signature that changes as soon as the thread ``thread_id`` executes
+        any instruction: its innermost frame and instruction offset.
+        """
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            return None
+        return id(frame), frame.f_lasti
+
+
+
+if __name__ == '__main__':
+    from .progress_bar import ProgressBar
+    from .task import Task
+
+    def read_from_network_drive(i):
+        time.sleep(5 if i == 30 else 0.01) # hangs on one item
+
+    for i in ProgressBar(range(60), watchdog=1):
+        read_from_network_drive(i)
+
+    with Task("Waiting for a lock", watchdog=1):
+        lock = threading.Lock()
+        lock.acquire()
+        lock.acquire(timeout=3.5)